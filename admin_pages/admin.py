@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.contrib import admin
+from django.db.models import Count, Q
+from django.utils.timezone import now
+
+from admin_pages import outbox
+from admin_pages.models import EmailBatch, OutboxEmail
+
+
+@admin.register(EmailBatch)
+class EmailBatchAdmin(admin.ModelAdmin):
+    """option d'affichage des envois d'emails dans la vue django admin"""
+
+    list_display = ("name", "created", "finished", "nb_sent", "nb_pending", "nb_failed")
+    readonly_fields = ("created", "finished")
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                nb_pending=Count("emails", filter=Q(emails__status=OutboxEmail.Status.PENDING)),
+                nb_sent=Count("emails", filter=Q(emails__status=OutboxEmail.Status.SENT)),
+                nb_failed=Count("emails", filter=Q(emails__status=OutboxEmail.Status.FAILED)),
+            )
+        )
+
+    @admin.display(description="envoyés", ordering="nb_sent")
+    def nb_sent(self, obj: EmailBatch) -> int:
+        return obj.nb_sent  # type: ignore
+
+    @admin.display(description="en attente", ordering="nb_pending")
+    def nb_pending(self, obj: EmailBatch) -> int:
+        return obj.nb_pending  # type: ignore
+
+    @admin.display(description="échecs", ordering="nb_failed")
+    def nb_failed(self, obj: EmailBatch) -> int:
+        return obj.nb_failed  # type: ignore
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    """option d'affichage des emails de la file d'envoi dans la vue django admin"""
+
+    list_display = ("subject", "to", "status", "attempts", "next_attempt", "sent_at")
+    list_filter = ("status", "batch")
+    list_select_related = ("batch",)
+    search_fields = ("to", "subject")
+    readonly_fields = ("attempts", "last_error", "sent_at")
+    actions = ["retry"]
+
+    @admin.action(description="Renvoyer les emails sélectionnés (sauf ceux déjà envoyés)")
+    def retry(self, request, queryset) -> None:
+        queryset = queryset.exclude(status=OutboxEmail.Status.SENT)
+        EmailBatch.objects.filter(emails__in=queryset).update(finished=None)
+        nb = queryset.update(status=OutboxEmail.Status.PENDING, attempts=0, next_attempt=now())
+        if settings.OUTBOX_THREAD:
+            outbox.start_worker()
+        self.message_user(request, "{} email(s) remis dans la file d'envoi".format(nb))
@@ -0,0 +1,164 @@
+from collections import deque
+from dataclasses import dataclass, field
+from random import Random
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from django.db import transaction
+
+from admin_pages.checks import invalidate_checks
+from home import models
+from home.planning import SlotIntervals
+
+
+@dataclass
+class AllocationResult:
+    """Résultat d'une répartition automatique"""
+
+    wishes: int = 0
+    granted: int = 0
+    changes: int = 0
+    participants: int = 0
+    unsatisfied: int = 0  # participants n'ayant obtenu aucun de leurs souhaits
+    cancelled_slots: List[models.SlotModel] = field(default_factory=list)
+
+
+class ActivityAllocator:
+    """Répartition des activités à partir des souhaits (ActivityChoicesModel)
+
+    La répartition se fait par tours: à chaque tour, chaque participant obtient
+    son souhait réalisable de plus haute priorité. Un souhait est réalisable si
+    le créneau n'est pas plein, ne chevauche pas un créneau déjà obtenu (ou
+    une activité que le participant organise) et n'est pas une activité déjà
+    obtenue. L'ordre de passage est tiré au hasard à chaque tour, ainsi personne
+    n'a un second souhait avant que tout le monde ait eu la possibilité d'avoir
+    un premier.
+
+    Les créneaux qui n'atteignent pas leur minimum de participants sont ensuite
+    annulés un par un (le moins rempli d'abord) et la répartition est recalculée
+    sans eux."""
+
+    def __init__(self, seed: Optional[int] = 0) -> None:
+        self.seed = seed
+        self.load()
+
+    def load(self) -> None:
+        """Charge toutes les données nécessaires en quelques requêtes"""
+        slots = list(models.SlotModel.objects.filter(subscribing_open=True).select_related("activity"))
+        self.slots: Dict[int, models.SlotModel] = {slot.id: slot for slot in slots}
+        self.capacity: Dict[int, int] = {slot.id: slot.activity.max_participants for slot in slots}
+        self.minimum: Dict[int, int] = {slot.id: slot.activity.min_participants for slot in slots}
+        self.activity: Dict[int, int] = {slot.id: slot.activity_id for slot in slots}
+
+        self.conflicts: Dict[int, Set[int]] = {slot.id: set() for slot in slots}
+        for slot_1, slot_2 in SlotIntervals(slots).overlapping_pairs():
+            self.conflicts[slot_1.id].add(slot_2.id)
+            self.conflicts[slot_2.id].add(slot_1.id)
+
+        # Slots hosted by each user
+        hosted: Dict[int, Set[int]] = {}
+        for slot in slots:
+            if slot.activity.host_id is not None:
+                hosted.setdefault(slot.activity.host_id, set()).add(slot.id)
+
+        # Wishes (choice id, slot id) of each participant, by order of priority
+        self.wishes: Dict[int, List[Tuple[int, int]]] = {}
+        self.forbidden: Dict[int, Set[int]] = {}
+        choices = (
+            models.ActivityChoicesModel.objects.filter(
+                participant__is_registered=True,
+                participant__user__is_active=True,
+                slot__subscribing_open=True,
+            )
+            .order_by("participant", "priority")
+            .values_list("id", "participant_id", "participant__user_id", "slot_id")
+        )
+        for choice_id, participant_id, user_id, slot_id in choices:
+            self.wishes.setdefault(participant_id, []).append((choice_id, slot_id))
+            if user_id in hosted and participant_id not in self.forbidden:
+                forbidden = set(hosted[user_id])
+                for slot_id in hosted[user_id]:
+                    forbidden.update(self.conflicts[slot_id])
+                self.forbidden[participant_id] = forbidden
+
+    def allocate(self, excluded: Set[int]) -> Dict[int, List[Tuple[int, int]]]:
+        """Calcule une répartition sans les créneaux de excluded
+        Renvoie les souhaits (choice id, slot id) obtenus par chaque participant"""
+        rng = Random(self.seed)
+        remaining = {slot_id: cap for slot_id, cap in self.capacity.items() if cap != 0}
+        pending: Dict[int, Deque[Tuple[int, int]]] = {p: deque(wishes) for p, wishes in self.wishes.items()}
+        granted: Dict[int, List[Tuple[int, int]]] = {p: [] for p in self.wishes}
+        blocked: Dict[int, Set[int]] = {p: set(self.forbidden.get(p, ())) for p in self.wishes}
+        activities: Dict[int, Set[int]] = {p: set() for p in self.wishes}
+
+        active = list(self.wishes)
+        while active:
+            rng.shuffle(active)
+            still_active = []
+            for participant in active:
+                queue = pending[participant]
+                while queue:
+                    # A wish that isn't possible now will never be
+                    choice_id, slot_id = queue.popleft()
+                    if (
+                        slot_id in excluded
+                        or slot_id in blocked[participant]
+                        or self.activity[slot_id] in activities[participant]
+                        or remaining.get(slot_id, 1) <= 0
+                    ):
+                        continue
+                    granted[participant].append((choice_id, slot_id))
+                    blocked[participant].update(self.conflicts[slot_id])
+                    activities[participant].add(self.activity[slot_id])
+                    if slot_id in remaining:
+                        remaining[slot_id] -= 1
+                    still_active.append(participant)
+                    break
+            active = still_active
+        return granted
+
+    def run(self) -> Tuple[Dict[int, List[Tuple[int, int]]], List[int]]:
+        """Répartition complète, annulant les créneaux en sous-effectif
+        Renvoie la répartition et la liste des créneaux annulés"""
+        excluded: Set[int] = set()
+        cancelled: List[int] = []
+        while True:
+            granted = self.allocate(excluded)
+            counts = {slot_id: 0 for slot_id in self.slots}
+            for wishes in granted.values():
+                for _, slot_id in wishes:
+                    counts[slot_id] += 1
+            underfilled = [
+                slot_id
+                for slot_id, count in counts.items()
+                if slot_id not in excluded and 0 < count < self.minimum[slot_id]
+            ]
+            if not underfilled:
+                return granted, cancelled
+            worst = min(underfilled, key=lambda slot_id: (counts[slot_id] / self.minimum[slot_id], slot_id))
+            excluded.add(worst)
+            cancelled.append(worst)
+
+    def save(self) -> AllocationResult:
+        """Calcule la répartition et l'enregistre dans la base de données
+        Les choix non retenus (y compris ceux des non-inscrits) sont marqués comme non obtenus"""
+        granted, cancelled = self.run()
+        accepted = {choice_id for wishes in granted.values() for choice_id, _ in wishes}
+
+        changed = []
+        with transaction.atomic():
+            for choice in models.ActivityChoicesModel.objects.select_for_update().only("id", "accepted"):
+                value = choice.id in accepted
+                if choice.accepted != value:
+                    choice.accepted = value
+                    changed.append(choice)
+            models.ActivityChoicesModel.objects.bulk_update(changed, ["accepted"], batch_size=500)
+        invalidate_checks("choices")
+
+        return AllocationResult(
+            wishes=sum(len(wishes) for wishes in self.wishes.values()),
+            granted=len(accepted),
+            changes=len(changed),
+            participants=len(self.wishes),
+            unsatisfied=sum(1 for wishes in granted.values() if not wishes),
+            cancelled_slots=[self.slots[slot_id] for slot_id in cancelled],
+        )
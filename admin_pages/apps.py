@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class AdminPagesConfig(AppConfig):
     name = "admin_pages"
+
+    def ready(self) -> None:
+        from admin_pages import signals  # noqa: F401
@@ -0,0 +1,211 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import wraps
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, TypeVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.formats import number_format
+from django.utils.html import escape
+from django.utils.timezone import now
+
+from shared.cache import bump_version, get_version
+from site_settings.models import get_year
+
+# Data the checks of AdminView depend on, and the models it is made of.
+# A check result stays cached until one of the models of its dependencies
+# is saved or deleted (see admin_pages.signals)
+CHECK_DEPENDENCIES: Dict[str, List[str]] = {
+    "activities": ["home.ActivityModel"],
+    "slots": ["home.SlotModel"],
+    "participants": ["home.ParticipantModel"],
+    "choices": ["home.ActivityChoicesModel"],
+    "users": ["accounts.EmailUser"],
+}
+
+# Results are recomputed at least once a day
+CHECK_CACHE_TIMEOUT = 24 * 3600
+# A failing check is retried after a minute
+CHECK_ERROR_TIMEOUT = 60
+# Number of runs kept in the timing history of each check
+CHECK_TIMING_HISTORY = 10
+
+
+def dependency_version(dependency: str) -> str:
+    return "checks:" + dependency
+
+
+def invalidate_checks(*dependencies: str) -> None:
+    """Invalide les checks qui dépendent de ces données, une fois la transaction en cours validée
+    (à appeler après les modifications qui n'envoient pas de signaux, comme bulk_update)"""
+
+    def bump() -> None:
+        for dependency in dependencies:
+            bump_version(dependency_version(dependency))
+
+    # Bumping before the commit would let a check running meanwhile read the old data
+    # and cache it under the new version
+    transaction.on_commit(bump)
+
+
+def check_cache_key(name: str, dependencies: List[str]) -> str:
+    versions = ".".join(str(get_version(dependency_version(dependency))) for dependency in dependencies)
+    return "check:{}:{}:{}".format(name, get_year(), versions)
+
+
+def cached_check(*dependencies: str) -> Callable[[Callable[..., str]], Callable[..., str]]:
+    """Met en cache le résultat d'un check de AdminView
+    jusqu'à la modification des données dont il dépend"""
+    for dependency in dependencies:
+        assert dependency in CHECK_DEPENDENCIES, "Unknown check dependency " + dependency
+
+    def decorator(check: Callable[..., str]) -> Callable[..., str]:
+        @wraps(check)
+        def wrapped(self, *args, **kwargs) -> str:
+            # The key is built before running the check: if the data changes meanwhile
+            # (versions are bumped once the change is committed), the result
+            # is stored under an outdated version and never read
+            key = check_cache_key(check.__name__, list(dependencies))
+            result: Optional[str] = cache.get(key)
+            if result is None:
+                with timed(check.__name__):
+                    result = check(self, *args, **kwargs)
+                cache.set(key, result, CHECK_CACHE_TIMEOUT)
+            return result
+
+        wrapped.dependencies = dependencies  # type: ignore
+        wrapped.cache_key = lambda: check_cache_key(check.__name__, list(dependencies))  # type: ignore
+        return wrapped
+
+    return decorator
+
+
+def timings_key(name: str) -> str:
+    return "check_timings:" + name
+
+
+T = TypeVar("T")
+
+
+def shared_check_data(*dependencies: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Met en cache des données lues par plusieurs checks de AdminView
+    jusqu'à la modification des données dont elles dépendent.
+    Les checks lancés en parallèle attendent le premier chargement au lieu de les charger chacun"""
+    for dependency in dependencies:
+        assert dependency in CHECK_DEPENDENCIES, "Unknown check dependency " + dependency
+
+    def decorator(load: Callable[..., T]) -> Callable[..., T]:
+        lock = threading.Lock()
+
+        @wraps(load)
+        def wrapped(self, *args, **kwargs) -> T:
+            key = check_cache_key(load.__name__, list(dependencies))
+            with lock:
+                data: Optional[T] = cache.get(key)
+                if data is None:
+                    data = load(self, *args, **kwargs)
+                    cache.set(key, data, CHECK_CACHE_TIMEOUT)
+            return data
+
+        return wrapped
+
+    return decorator
+
+
+# Timings of the checks, shared by the threads of this process
+_timings_lock = threading.Lock()
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Mesure la durée du bloc, et le nombre et la durée de ses requêtes SQL
+    Les mesures sont ajoutées à l'historique du check name"""
+    timing: Dict[str, Any] = {"date": now(), "queries": 0, "sql_time": 0.0}
+
+    def count_queries(execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timing["queries"] += 1
+            timing["sql_time"] += perf_counter() - start
+
+    start = perf_counter()
+    try:
+        # Only wraps the queries of the current thread's connection
+        with connection.execute_wrapper(count_queries):
+            yield
+    finally:
+        timing["duration"] = perf_counter() - start
+        # One key per check: processes only update the history of the checks they run
+        with _timings_lock:
+            history: List[Dict[str, Any]] = cache.get(timings_key(name), [])
+            cache.set(timings_key(name), (history + [timing])[-CHECK_TIMING_HISTORY:], timeout=None)
+
+
+def get_timings(names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Historique des mesures de ces checks (ceux déjà mesurés),
+    de la plus ancienne à la plus récente"""
+    histories = cache.get_many([timings_key(name) for name in names])
+    return {name: histories[timings_key(name)] for name in names if timings_key(name) in histories}
+
+
+def format_timing(timing: Dict[str, Any]) -> str:
+    return "{} s, {} requête(s) SQL en {} s".format(
+        number_format(timing["duration"], 3), timing["queries"], number_format(timing["sql_time"], 3)
+    )
+
+
+# Background checks: cache keys being computed, and the pool computing them
+_running: Set[str] = set()
+_running_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_check_results(view, names: List[str]) -> Dict[str, Optional[str]]:
+    """Résultats des checks de la vue (des méthodes décorées par cached_check)
+
+    Sans settings.CHECK_THREADS, les checks manquants sont calculés immédiatement.
+    Sinon ils sont lancés en arrière-plan et leur résultat vaut None"""
+    if not settings.CHECK_THREADS:
+        return {name: getattr(view, name)() for name in names}
+    keys = {name: getattr(view, name).cache_key() for name in names}
+    results = cache.get_many(list(keys.values()))
+    missing = [name for name, key in keys.items() if key not in results]
+    if missing:
+        start_checks(type(view), {name: keys[name] for name in missing})
+    return {name: results.get(key) for name, key in keys.items()}
+
+
+def start_checks(view_class, keys: Dict[str, str]) -> None:
+    """Lance en parallèle les checks qui ne sont pas déjà en cours de calcul
+    Ils ne font que lire la base, chacun avec sa propre instance de la vue
+    (ses cached_property ne sont pas thread-safe)"""
+    global _executor
+    with _running_lock:
+        keys = {name: key for name, key in keys.items() if key not in _running}
+        _running.update(keys.values())
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.CHECK_THREADS, thread_name_prefix="checks")
+        executor = _executor
+    for name, key in keys.items():
+        executor.submit(_run_check, view_class(), name, key)
+
+
+def _run_check(view, name: str, key: str) -> None:
+    try:
+        getattr(view, name)()
+    except Exception as error:
+        # Cached briefly, so that the page displays the error instead of waiting forever
+        cache.set(
+            key,
+            view.format_error(escape("La vérification {} a échoué ({}: {})".format(name, type(error).__name__, error))),
+            CHECK_ERROR_TIMEOUT,
+        )
+    finally:
+        with _running_lock:
+            _running.discard(key)
+        connection.close()
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from admin_pages import outbox
+
+
+class Command(BaseCommand):
+    help = "Envoie les emails en attente dans la file d'envoi des pages admin"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Continue à surveiller la file au lieu de s'arrêter quand plus aucun email n'est prêt",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=10,
+            help="Avec --loop, intervalle maximal (en secondes) entre deux vérifications de la file",
+        )
+
+    def handle(self, *args, loop: bool, poll: float, **options) -> None:
+        while True:
+            handled = outbox.send_pending()
+            if handled:
+                self.stdout.write("{} email(s) traité(s)".format(handled))
+            delay = outbox.next_delay()
+            if not loop:
+                if delay is not None:
+                    self.stdout.write("Emails restant en attente, prochaine tentative dans {:.0f}s".format(delay))
+                return
+            time.sleep(poll if delay is None else min(delay, poll))
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailBatch',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='nom')),
+                ('report', models.TextField(blank=True, help_text="Corps du mail envoyé aux admins à la fin de l'envoi", verbose_name='rapport')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='créé le')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='terminé le')),
+            ],
+            options={
+                'verbose_name': "envoi d'emails",
+                'verbose_name_plural': "envois d'emails",
+                'ordering': ('-created',),
+            },
+        ),
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='sujet')),
+                ('body', models.TextField(verbose_name='message')),
+                ('from_email', models.CharField(blank=True, help_text='Vide pour DEFAULT_FROM_EMAIL', max_length=254, verbose_name='de')),
+                ('to', models.TextField(help_text='Adresses séparées par des virgules', verbose_name='à')),
+                ('status', models.CharField(choices=[('P', 'En attente'), ('S', 'Envoyé'), ('F', 'Échec')], default='P', max_length=1, verbose_name='statut')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='tentatives')),
+                ('last_error', models.TextField(blank=True, verbose_name='dernière erreur')),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='prochaine tentative')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='envoyé le')),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='emails', to='admin_pages.emailbatch', verbose_name='envoi')),
+            ],
+            options={
+                'verbose_name': 'email',
+                'ordering': ('id',),
+                'indexes': [models.Index(fields=['status', 'next_attempt'], name='admin_pages_status_bfb2c2_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+from typing import List
+
+from django.db import models
+from django.utils.timezone import now
+
+
+class EmailBatch(models.Model):
+    """Groupe d'emails envoyés en une fois depuis les pages admin
+    Un rapport est envoyé aux admins une fois tous les emails traités"""
+
+    name = models.CharField("nom", max_length=200)
+    report = models.TextField("rapport", blank=True, help_text="Corps du mail envoyé aux admins à la fin de l'envoi")
+    created = models.DateTimeField("créé le", auto_now_add=True)
+    finished = models.DateTimeField("terminé le", null=True, blank=True)
+
+    def __str__(self) -> str:
+        return "{} ({})".format(self.name, self.created.strftime("%d/%m/%Y %H:%M"))
+
+    class Meta:
+        ordering = ("-created",)
+        verbose_name = "envoi d'emails"
+        verbose_name_plural = "envois d'emails"
+
+
+class OutboxEmail(models.Model):
+    """Email en attente d'envoi (ou déjà envoyé)"""
+
+    class Status(models.TextChoices):
+        PENDING = "P", "En attente"
+        SENT = "S", "Envoyé"
+        FAILED = "F", "Échec"
+
+    batch = models.ForeignKey(EmailBatch, on_delete=models.CASCADE, related_name="emails", verbose_name="envoi")
+    subject = models.CharField("sujet", max_length=255)
+    body = models.TextField("message")
+    from_email = models.CharField("de", max_length=254, blank=True, help_text="Vide pour DEFAULT_FROM_EMAIL")
+    to = models.TextField("à", help_text="Adresses séparées par des virgules")
+
+    status = models.CharField("statut", max_length=1, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField("tentatives", default=0)
+    last_error = models.TextField("dernière erreur", blank=True)
+    next_attempt = models.DateTimeField("prochaine tentative", default=now)
+    sent_at = models.DateTimeField("envoyé le", null=True, blank=True)
+
+    def recipients(self) -> List[str]:
+        return [address.strip() for address in self.to.split(",") if address.strip()]
+
+    def __str__(self) -> str:
+        return "{} -> {}".format(self.subject, self.to)
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [models.Index(fields=["status", "next_attempt"])]
+        verbose_name = "email"
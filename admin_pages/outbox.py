@@ -0,0 +1,198 @@
+"""File d'envoi des emails de masse
+
+Les vues admin enregistrent les emails dans la base (enqueue) et rendent la
+main immédiatement. Les emails sont ensuite envoyés par send_pending, soit
+depuis un thread du serveur (réglage OUTBOX_THREAD), soit par la commande
+`python manage.py send_outbox`. Chaque email garde son statut, l'envoi peut
+donc reprendre là où il s'est arrêté."""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, mail_admins
+from django.db import connection as db_connection
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils.timezone import now
+
+from admin_pages.models import EmailBatch, OutboxEmail
+
+# Subject, Message, From, To
+EMAIL = Tuple[str, str, Optional[str], Sequence[str]]
+
+# An email is reserved for this long while being sent. If the worker dies
+# before recording the result, the email becomes due again afterwards.
+LEASE = timedelta(minutes=10)
+
+PENDING = OutboxEmail.Status.PENDING
+SENT = OutboxEmail.Status.SENT
+FAILED = OutboxEmail.Status.FAILED
+
+
+def enqueue(name: str, report: str, emails: Iterable[EMAIL]) -> EmailBatch:
+    """Ajoute un groupe d'emails à la file d'envoi
+    name et report sont le sujet et le début du mail envoyé aux admins une fois l'envoi terminé"""
+    with transaction.atomic():
+        batch = EmailBatch.objects.create(name=name, report=report)
+        OutboxEmail.objects.bulk_create(
+            (
+                OutboxEmail(batch=batch, subject=subject, body=body, from_email=from_email or "", to=",".join(to))
+                for subject, body, from_email, to in emails
+            ),
+            batch_size=500,
+        )
+    if settings.OUTBOX_THREAD:
+        transaction.on_commit(start_worker)
+    return batch
+
+
+def batch_counts(batch_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+    """Nombre d'emails de chaque statut dans chaque envoi"""
+    counts = EmailBatch.objects.filter(id__in=batch_ids).annotate(
+        pending=Count("emails", filter=Q(emails__status=PENDING)),
+        sent=Count("emails", filter=Q(emails__status=SENT)),
+        failed=Count("emails", filter=Q(emails__status=FAILED)),
+    )
+    return {
+        batch["id"]: {"pending": batch["pending"], "sent": batch["sent"], "failed": batch["failed"]}
+        for batch in counts.values("id", "pending", "sent", "failed")
+    }
+
+
+class Throttle:
+    """Limite le débit à rate emails par minute (0 pour ne pas limiter)"""
+
+    def __init__(self, rate: int) -> None:
+        self.interval = 60 / rate if rate else 0.0
+        self.last: Optional[float] = None
+
+    def wait(self) -> None:
+        if self.interval and self.last is not None:
+            delay = self.last + self.interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.last = time.monotonic()
+
+
+def claim(email: OutboxEmail) -> bool:
+    """Réserve un email pour l'envoyer, renvoie False s'il a été pris par un autre worker"""
+    claimed = OutboxEmail.objects.filter(id=email.id, status=PENDING, next_attempt=email.next_attempt).update(
+        next_attempt=now() + LEASE
+    )
+    return claimed == 1
+
+
+def send_one(connection, email: OutboxEmail) -> None:
+    """Envoie un email et enregistre le résultat
+    En cas d'erreur, l'email est reprogrammé avec un délai doublant à chaque tentative"""
+    message = EmailMessage(
+        email.subject, email.body, email.from_email or None, email.recipients(), connection=connection
+    )
+    email.attempts += 1
+    try:
+        connection.open()  # no-op when already open, reconnects after an error
+        message.send(fail_silently=False)
+    except Exception as error:
+        connection.close()
+        email.last_error = "{}: {}".format(type(error).__name__, error)
+        if email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+            email.status = FAILED
+        else:
+            email.next_attempt = now() + timedelta(seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (email.attempts - 1))
+    else:
+        email.status = SENT
+        email.sent_at = now()
+    email.save(update_fields=["status", "attempts", "last_error", "next_attempt", "sent_at"])
+
+
+def finish_batches(batch_ids: Set[int]) -> None:
+    """Marque comme terminés les envois qui n'ont plus d'email en attente
+    et envoie leur rapport aux admins"""
+    for batch_id, counts in batch_counts(batch_ids).items():
+        if counts["pending"]:
+            continue
+        # Conditional update so that the report is only sent once
+        if not EmailBatch.objects.filter(id=batch_id, finished__isnull=True).update(finished=now()):
+            continue
+        batch = EmailBatch.objects.get(id=batch_id)
+        failures = ""
+        if counts["failed"]:
+            failures = "Nombre de mail en échec: {} (voir l'admin django)\n".format(counts["failed"])
+        mail_admins(
+            batch.name,
+            "{}\nNombre total de mail envoyés: {}\n{}\n{}".format(
+                batch.report, counts["sent"], failures, settings.EMAIL_SIGNATURE
+            ),
+            fail_silently=True,  # the batch is already recorded as finished
+        )
+
+
+def send_pending(limit: Optional[int] = None) -> int:
+    """Envoie les emails en attente dont l'heure est venue, par lots de
+    OUTBOX_BATCH_SIZE sur une même connexion SMTP
+    Renvoie le nombre d'emails traités (envoyés ou non)"""
+    handled = 0
+    throttle = Throttle(settings.OUTBOX_RATE_LIMIT)
+    while limit is None or handled < limit:
+        size = settings.OUTBOX_BATCH_SIZE if limit is None else min(settings.OUTBOX_BATCH_SIZE, limit - handled)
+        emails: List[OutboxEmail] = list(OutboxEmail.objects.filter(status=PENDING, next_attempt__lte=now())[:size])
+        if not emails:
+            break
+        connection = get_connection()
+        try:
+            for email in emails:
+                if not claim(email):
+                    continue
+                throttle.wait()
+                send_one(connection, email)
+                handled += 1
+        finally:
+            connection.close()
+        finish_batches({email.batch_id for email in emails})
+    return handled
+
+
+def next_delay() -> Optional[float]:
+    """Délai en secondes avant le prochain email à envoyer, None si la file est vide"""
+    pending = OutboxEmail.objects.filter(status=PENDING)
+    next_attempt: Optional[datetime] = pending.aggregate(next=Min("next_attempt"))["next"]
+    if next_attempt is None:
+        return None
+    return max((next_attempt - now()).total_seconds(), 0.0)
+
+
+_worker: Optional[threading.Thread] = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def start_worker() -> None:
+    """Lance le thread d'envoi, ou le réveille s'il attend déjà"""
+    global _worker
+    with _worker_lock:
+        _wakeup.set()
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_worker_loop, name="outbox", daemon=True)
+            _worker.start()
+
+
+def _worker_loop() -> None:
+    """Envoie les emails jusqu'à ce que la file soit vide,
+    en attendant les prochaines tentatives des emails en échec"""
+    global _worker
+    try:
+        while True:
+            _wakeup.clear()
+            send_pending()
+            delay = next_delay()
+            with _worker_lock:
+                # Emails enqueued since the last check set _wakeup
+                if delay is None and not _wakeup.is_set():
+                    _worker = None
+                    return
+            _wakeup.wait(delay)
+    finally:
+        db_connection.close()
@@ -0,0 +1,25 @@
+from functools import partial
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+
+from admin_pages.checks import CHECK_DEPENDENCIES, invalidate_checks
+
+# bulk_create, bulk_update and queryset.update do not send signals,
+# code using them on these models must call invalidate_checks itself
+
+
+def data_changed(dependency: str, sender, update_fields=None, **kwargs) -> None:
+    # Logins only update last_login, which no check displays
+    if update_fields is not None and set(update_fields) == {"last_login"}:
+        return
+    invalidate_checks(dependency)
+
+
+for dependency, labels in CHECK_DEPENDENCIES.items():
+    receiver = partial(data_changed, dependency)
+    for label in labels:
+        model = apps.get_model(label)
+        uid = "checks_{}_{}".format(dependency, label)
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
@@ -6,9 +6,11 @@ from site_settings.models import ENS
 urlpatterns = [
     path("", views.AdminView.as_view(), name="index"),
     path("info", views.SiteInfo.as_view(), name="info"),
+    path("validation.json", views.AdminValidationView.as_view(), name="validation"),
     path("export/activities/", views.ExportActivities.as_view(), name="activities.csv"),
     path("export/slots/", views.ExportSlots.as_view(), name="slots.csv"),
     path("import/activity_choices/", views.CSV_UploadView.as_view(), name="csv_upload"),
+    path("allocation/", views.AllocationView.as_view(), name="allocation"),
     path(
         "export/participants/",
         views.ExportParticipants.as_view(),
@@ -55,4 +57,5 @@ urlpatterns = [
         name="email_orgas_planning",
     ),
     path("email/new_email/", views.NewEmail.as_view(), name="email_new"),
+    path("email/batch/<int:pk>/", views.EmailBatchView.as_view(), name="email_batch"),
 ]
@@ -1,90 +1,153 @@
+from collections import defaultdict
 from csv import reader
-from typing import Any, Dict, List, Optional, Tuple
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from django import VERSION
 from django.conf import settings
 from django.contrib import messages
-from django.core.mail import mail_admins, send_mass_mail
-from django.db.models import Count
-from django.http import HttpRequest, HttpResponse, HttpResponseRedirect
+from django.db import transaction
+from django.db.models import Case, Count, Prefetch, Q, QuerySet, Sum, Value, When
+from django.http import HttpRequest, HttpResponse, HttpResponseRedirect, JsonResponse
 from django.template.defaultfilters import date as django_date
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 from django.urls import reverse, reverse_lazy
+from django.utils.functional import cached_property
 from django.utils.timezone import now
-from django.views.generic import FormView, RedirectView, TemplateView
+from django.views.generic import DetailView, FormView, RedirectView, TemplateView
 
 from accounts.models import EmailUser
+from admin_pages import outbox
+from admin_pages.allocation import ActivityAllocator
+from admin_pages.checks import (
+    cached_check,
+    format_timing,
+    get_check_results,
+    get_timings,
+    invalidate_checks,
+    shared_check_data,
+    timed,
+)
 from admin_pages.forms import FileUploadForm, Recipients, SendEmailForm
+from admin_pages.models import EmailBatch, OutboxEmail
+from admin_pages.outbox import EMAIL
 from home import models
+from home.planning import SlotIntervals, SlotPairs, prefetch_slots
 from home.views import get_planning_context
 from interludes import settings as site_settings
 from shared.views import CSVWriteView, SuperuserRequiredMixin
-from site_settings.models import ENS, Colors, SiteSettings, get_year
+from site_settings.models import ENS, MEALS, OPTIONS, Colors, SiteSettings, get_year
 
 # ==============================
 # Main Admin views
 # ==============================
 
 
+def money(value: Optional[Decimal]) -> Decimal:
+    """Format prices computed in SQL (SQLite doesn't keep their decimal places)"""
+    return (value or Decimal(0)).quantize(Decimal("0.01"))
+
+
+class ActivitySlots(NamedTuple):
+    """Activité affichée et tous ses créneaux (cf AdminView.displayed_activities)"""
+
+    activity: models.ActivityModel
+    slots: List[models.SlotModel]
+
+    def listed_slots(self) -> List[models.SlotModel]:
+        """Créneaux listés sur l'activité, comme ActivityModel.slots"""
+        return [slot for slot in self.slots if slot.on_activity]
+
+
 class AdminView(SuperuserRequiredMixin, TemplateView):
     template_name = "admin.html"
 
+    @timed("get_metrics")
     def get_metrics(self) -> Any:
-        """Various metrics, return as a class"""
+        """Various metrics, return as a class
+        Computed with a constant number of aggregate queries"""
         year = get_year()
+        settings = SiteSettings.load()
         registered = models.ParticipantModel.objects.filter(is_registered=True, user__is_active=True)
-        acts = models.ActivityModel.objects.filter(year=year)
-        slots_in = models.SlotModel.objects.filter(activity__year=year)
-        wishes = models.ActivityChoicesModel.objects.filter(
-            participant__is_registered=True, participant__user__is_active=True
+        costs = models.ParticipantModel.cost_expressions(settings)
+
+        def count(**filters) -> Count:
+            return Count("id", filter=Q(**filters))
+
+        people = registered.aggregate(
+            participants=Count("id"),
+            ulm=count(school=ENS.ENS_ULM),
+            lyon=count(school=ENS.ENS_LYON),
+            rennes=count(school=ENS.ENS_RENNES),
+            saclay=count(school=ENS.ENS_CACHAN),
+            # aliases must differ from field names used in cost expressions
+            nb_sleeps=count(sleeps=True),
+            nb_paid=count(paid=True),
+            **{"nb_meal_" + meal: count(**{"meal_" + meal: True}) for meal in MEALS},
+            **{"nb_" + option: count(**{option: True}) for option in OPTIONS},
+            revenue=Sum(costs["cost"]),
+            revenue_meal=Sum(costs["cost_meals"]),
+            revenue_sleep=Sum(costs["cost_sleep"]),
+            revenue_entry=Sum(costs["cost_entry"]),
+            revenue_options=Sum(costs["cost_options"]),
         )
-        settings = SiteSettings.load()
+        meal_counts = [people["nb_meal_" + meal] if getattr(settings, "meal_" + meal) else 0 for meal in MEALS]
+        option_counts = [people["nb_" + option] if getattr(settings, option + "_enable") else 0 for option in OPTIONS]
+        acts = models.ActivityModel.objects.filter(year=year).aggregate(
+            activites=Count("id"),
+            displayed=count(display=True),
+            act_ins=count(display=True, must_subscribe=True),
+            communicate=count(communicate_participants=True),
+            st_present=count(display=True, status=models.ActivityModel.Status.PRESENT),
+            st_distant=count(display=True, status=models.ActivityModel.Status.DISTANT),
+            st_both=count(display=True, status=models.ActivityModel.Status.BOTH),
+        )
+        slots_in = models.SlotModel.objects.filter(activity__year=year).aggregate(
+            slots=Count("id"),
+            true_ins=count(subscribing_open=True),
+        )
+        wishes = models.ActivityChoicesModel.objects.aggregate(
+            wish=count(participant__is_registered=True, participant__user__is_active=True),
+            granted=count(participant__is_registered=True, participant__user__is_active=True, accepted=True),
+            malformed=count(slot__subscribing_open=False),
+        )
+        active_users = EmailUser.objects.filter(is_active=True).count()
 
         class metrics:
-            participants = registered.count()
-            ulm = registered.filter(school=ENS.ENS_ULM).count()
-            lyon = registered.filter(school=ENS.ENS_LYON).count()
-            rennes = registered.filter(school=ENS.ENS_RENNES).count()
-            saclay = registered.filter(school=ENS.ENS_CACHAN).count()
-            non_registered = EmailUser.objects.filter(is_active=True).count() - participants
+            participants = people["participants"]
+            ulm = people["ulm"]
+            lyon = people["lyon"]
+            rennes = people["rennes"]
+            saclay = people["saclay"]
+            non_registered = active_users - participants
             # mugs = registered.filter(mug=True).count()
-            sleeps = registered.filter(sleeps=True).count()
-            paid = registered.filter(paid=True).count()
-
-            meal1 = registered.filter(meal_friday_evening=True).count() if settings.meal_friday_evening else 0
-            meal2 = registered.filter(meal_saturday_morning=True).count() if settings.meal_saturday_morning else 0
-            meal3 = registered.filter(meal_saturday_midday=True).count() if settings.meal_saturday_midday else 0
-            meal4 = registered.filter(meal_saturday_evening=True).count() if settings.meal_saturday_evening else 0
-            meal5 = registered.filter(meal_sunday_morning=True).count() if settings.meal_sunday_morning else 0
-            meal6 = registered.filter(meal_sunday_midday=True).count() if settings.meal_sunday_midday else 0
-            meal7 = registered.filter(meal_sunday_evening=True).count() if settings.meal_sunday_evening else 0
-            meals = meal1 + meal2 + meal3 + meal4 + meal5 + meal6 + meal7
-
-            option1 = registered.filter(option1=True).count() if settings.option1_enable else 0
-            option2 = registered.filter(option2=True).count() if settings.option2_enable else 0
-            option3 = registered.filter(option3=True).count() if settings.option3_enable else 0
-            option4 = registered.filter(option4=True).count() if settings.option4_enable else 0
-            option5 = registered.filter(option5=True).count() if settings.option5_enable else 0
-
-            activites = acts.count()
-            displayed = acts.filter(display=True).count()
-            act_ins = acts.filter(display=True, must_subscribe=True).count()
-            communicate = acts.filter(communicate_participants=True).count()
-            st_present = acts.filter(display=True, status=models.ActivityModel.Status.PRESENT).count()
-            st_distant = acts.filter(display=True, status=models.ActivityModel.Status.DISTANT).count()
-            st_both = acts.filter(display=True, status=models.ActivityModel.Status.BOTH).count()
-
-            slots = slots_in.count()
-            true_ins = slots_in.filter(subscribing_open=True).count()
-            wish = wishes.count()
-            granted = wishes.filter(accepted=True).count()
-            malformed = models.ActivityChoicesModel.objects.filter(slot__subscribing_open=False).count()
-
-            revenue = sum(x.cost() for x in registered)
-            revenue_meal = sum(x.cost_meals() for x in registered)
-            revenue_sleep = sum(x.cost_sleep() for x in registered)
-            revenue_entry = sum(x.cost_entry() for x in registered)
-            revenue_options = sum(x.cost_options() for x in registered)
+            sleeps = people["nb_sleeps"]
+            paid = people["nb_paid"]
+
+            meal1, meal2, meal3, meal4, meal5, meal6, meal7 = meal_counts
+            meals = sum(meal_counts)
+
+            option1, option2, option3, option4, option5 = option_counts
+
+            activites = acts["activites"]
+            displayed = acts["displayed"]
+            act_ins = acts["act_ins"]
+            communicate = acts["communicate"]
+            st_present = acts["st_present"]
+            st_distant = acts["st_distant"]
+            st_both = acts["st_both"]
+
+            slots = slots_in["slots"]
+            true_ins = slots_in["true_ins"]
+            wish = wishes["wish"]
+            granted = wishes["granted"]
+            malformed = wishes["malformed"]
+
+            revenue = money(people["revenue"])
+            revenue_meal = money(people["revenue_meal"])
+            revenue_sleep = money(people["revenue_sleep"])
+            revenue_entry = money(people["revenue_entry"])
+            revenue_options = money(people["revenue_options"])
 
         return metrics
 
@@ -138,14 +201,22 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
                 message += "<br> &bullet;&ensp; " + err
         return '<li class="error">' + message + "</li>"
 
+    @shared_check_data("activities", "slots")
+    def displayed_activities(self) -> List[ActivitySlots]:
+        """Displayed activities of the year with all their slots, loaded in two queries
+        and shared by the planning checks"""
+        activities = models.ActivityModel.objects.filter(display=True, year=get_year()).prefetch_related(
+            Prefetch("slotmodel_set", queryset=models.SlotModel.objects.order_by("start"))
+        )
+        return [ActivitySlots(activity, list(activity.slotmodel_set.all())) for activity in activities]
+
+    @cached_check("activities", "slots")
     def check_activity_slots(self) -> str:
         """Vérification du planning et de la répartition des activités:
         verifie que toutes les activité demandant une liste de participant ont un créneaux"""
-        activities = models.ActivityModel.objects.filter(display=True, communicate_participants=True, year=get_year())
         errors = []
-        for activity in activities:
-            count = models.SlotModel.objects.filter(activity=activity).count()
-            if count == 0:
+        for activity, slots in self.displayed_activities():
+            if activity.communicate_participants and not slots:
                 errors.append("{} (créer un {})".format(self.url_activity(activity), self.url_add_slot(activity)))
         if errors:
             return self.format_error(
@@ -154,6 +225,7 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             )
         return self.format_ok("Toutes les activités demandant une liste de participants ont au moins un créneau")
 
+    @cached_check("activities")
     def check_hidden_activities(self) -> str:
         """Vérification du planning et de la répartition des activités:
         Vérifie que des activités ne soient pas masquées"""
@@ -165,6 +237,7 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             return self.format_error("Certaines activités ne sont pas affichées", errors)
         return self.format_ok("Toutes les activités sont affichées")
 
+    @cached_check("activities")
     def check_planning_past_activities(self) -> str:
         """Vérifie que des activités des années passées ne sont pas affichés"""
         hidden_activites = models.ActivityModel.objects.filter(display=True).exclude(year=get_year())
@@ -175,6 +248,7 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             return self.format_error("Certaines activités des années passées sont affichées:", errors)
         return self.format_ok("Aucune activité des années passées n'est affichée")
 
+    @cached_check("activities", "slots")
     def check_planning_past_slots(self) -> str:
         """Vérifie que des créneaux des années passées ne sont pas affichés"""
         past_slots = models.SlotModel.objects.filter(on_planning=True).exclude(activity__year=get_year())
@@ -185,6 +259,7 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             return self.format_error("Certains créneaux des années passées apparaissent sur le planning:", errors)
         return self.format_ok("Aucun créneaux des années passées n'apparait sur le planning")
 
+    @cached_check("activities", "slots")
     def check_planning_slot_without_activities(self) -> str:
         """Vérifie que chaque créneau affiché correspond a une activité qui est elle aussi affichée"""
         slots = models.SlotModel.objects.filter(on_planning=True, activity__display=False)
@@ -199,18 +274,19 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             )
         return self.format_ok("Tous les créneaux du planning correspondent à des activités affichées")
 
+    @cached_check("activities", "slots")
     def check_planning_slots_display(self) -> str:
         """Vérifie que tout les créneaux pertinents sont affichés"""
-        activities = models.ActivityModel.objects.filter(display=True, year=get_year())
         errors = []
-        for activity in activities:
-            for slot in activity.slots():
+        for entry in self.displayed_activities():
+            for slot in entry.listed_slots():
                 if not slot.on_planning:
                     errors.append(self.url_slot(slot, "on_planning"))
         if errors:
             return self.format_error("Certains créneaux ne sont pas affichés sur le planning:", errors)
         return self.format_ok("Tous les créneaux (des activités affichées de cette année) sont affichés")
 
+    @cached_check("activities", "slots", "choices", "participants", "users")
     def check_repartition_participant_nb(self) -> str:
         """Vérification de la répartition des activités:
         Vérifie que le nombre de participant inscrit
@@ -242,62 +318,75 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             message += self.format_ok("Aucune créneau en sur-effectif")
         return message
 
-    Conflicts = List[Tuple[models.SlotModel, models.SlotModel]]
-
-    def get_conflicts(self) -> Conflicts:
-        """Returns a list of overlapping slot pairs"""
-        slots = models.SlotModel.objects.filter(subscribing_open=True)
-        conflicts = []
-        for i, slot_1 in enumerate(slots):
-            for slot_2 in slots[i + 1 :]:
-                if slot_1.conflicts(slot_2):
-                    conflicts.append((slot_1, slot_2))
-        return conflicts
-
-    def check_repartition_no_simultaneaous_inscriptions(self, conflicts: Conflicts) -> str:
-        """Vérification de la répartition des activités:
-        Vérifie que personne n'est inscrit à des activités simultanées
-        Vérifie aussi que personne n'est inscrit en même temps qu'une activité qu'il organise"""
-
-        base_qs = models.ActivityChoicesModel.objects.filter(
+    def get_slot_intervals(self) -> SlotIntervals:
+        """Index of all slots open to subscriptions, loaded in a single query"""
+        return SlotIntervals(models.SlotModel.objects.filter(subscribing_open=True).select_related("activity"))
+
+    @cached_property
+    def conflicts(self) -> SlotPairs:
+        """Overlapping slot pairs, only computed if a check is not cached"""
+        return self.get_slot_intervals().overlapping_pairs()
+
+    def get_accepted_participants(self) -> Tuple[Dict[int, Set[int]], Dict[int, int]]:
+        """Ids of the participants who obtained each slot (slot id -> participant ids)
+        and participant id of each of their users, loaded in a single query"""
+        by_slot: Dict[int, Set[int]] = defaultdict(set)
+        by_user: Dict[int, int] = dict()
+        choices = models.ActivityChoicesModel.objects.filter(
             accepted=True,
             participant__is_registered=True,
             participant__user__is_active=True,
-        )
-        errors = []
-        errors_orga = []
-        for slot_1, slot_2 in conflicts:
-            participants_1 = {x.participant for x in base_qs.filter(slot=slot_1)}
-            participants_2 = {x.participant for x in base_qs.filter(slot=slot_2)}
-            intersection = participants_1.intersection(participants_2)
+        ).values_list("slot_id", "participant_id", "participant__user_id")
+        for slot_id, participant_id, user_id in choices:
+            by_slot[slot_id].add(participant_id)
+            by_user[user_id] = participant_id
+        return by_slot, by_user
+
+    def load_participants(self, ids: Iterable[int]) -> Dict[int, models.ParticipantModel]:
+        """Participants (with their user) to display in error messages"""
+        return models.ParticipantModel.objects.select_related("user").in_bulk(set(ids))
+
+    @cached_check("activities", "slots", "choices", "participants", "users")
+    def check_repartition_no_simultaneaous_inscriptions(self) -> str:
+        """Vérification de la répartition des activités:
+        Vérifie que personne n'est inscrit à des activités simultanées
+        Vérifie aussi que personne n'est inscrit en même temps qu'une activité qu'il organise"""
+        by_slot, by_user = self.get_accepted_participants()
+        no_one: Set[int] = set()
+        overlaps = []
+        orgas = set()
+        for slot_1, slot_2 in self.conflicts:
+            participants_1 = by_slot.get(slot_1.id, no_one)
+            participants_2 = by_slot.get(slot_2.id, no_one)
+            intersection = participants_1 & participants_2
             if intersection:
-                errors.append(
-                    '{} participe à la fois à "{}" et à "{}"'.format(
-                        ", ".join(self.url_participant(x) for x in intersection),
-                        self.url_slot(slot_1),
-                        self.url_slot(slot_2),
-                    )
-                )
-            for participant in participants_1:
-                if participant.user == slot_2.activity.host:
-                    errors_orga.append(
-                        "{} ({}) organise '{}' et participe à {}".format(
-                            self.url_participant(participant),
-                            self.url_user(participant.user),
-                            self.url_slot(slot_2),
-                            self.url_slot(slot_1),
-                        )
-                    )
-            for participant in participants_2:
-                if participant.user == slot_1.activity.host:
-                    errors_orga.append(
-                        "{} ({}) organise '{}' et participe à {}".format(
-                            self.url_participant(participant),
-                            self.url_user(participant.user),
-                            self.url_slot(slot_2),
-                            self.url_slot(slot_1),
-                        )
-                    )
+                overlaps.append((sorted(intersection), slot_1, slot_2))
+            for hosted, other, attendees in ((slot_1, slot_2, participants_2), (slot_2, slot_1, participants_1)):
+                host_id = hosted.activity.host_id
+                host = by_user.get(host_id) if host_id is not None else None
+                if host in attendees:
+                    orgas.add((host, hosted, other))
+
+        participants = self.load_participants(
+            [id for ids, _, _ in overlaps for id in ids] + [host for host, _, _ in orgas]
+        )
+        errors = [
+            '{} participe à la fois à "{}" et à "{}"'.format(
+                ", ".join(self.url_participant(participants[id]) for id in ids),
+                self.url_slot(slot_1),
+                self.url_slot(slot_2),
+            )
+            for ids, slot_1, slot_2 in overlaps
+        ]
+        errors_orga = [
+            "{} ({}) organise '{}' et participe à {}".format(
+                self.url_participant(participants[host]),
+                self.url_user(participants[host].user),
+                self.url_slot(hosted),
+                self.url_slot(other),
+            )
+            for host, hosted, other in sorted(orgas, key=lambda orga: (orga[0], orga[1].id, orga[2].id))
+        ]
 
         result = ""
         if errors:
@@ -305,7 +394,6 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
         else:
             result += self.format_ok("Aucun inscrit à plusieurs créneaux simultanées")
         if errors_orga:
-            errors_orga = list(set(errors_orga))  # Ugly way to avoid duplicate warnings
             return result + self.format_error(
                 "Certains orgas sont incrit à des activités se déroulant en même temps que celle qu'ils organisent&nbsp;:",
                 errors_orga,
@@ -315,48 +403,44 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             "(Ne compare que les orgas principaux, pas les éventuels additionels)"
         )
 
+    @cached_check("activities", "slots", "choices", "participants", "users")
     def check_repartition_no_duplicate_inscription(self) -> str:
         """Vérification de la répartition des activités:
         vérifie que personne n'est inscrit à la même activité plusieurs fois"""
-        slots = models.SlotModel.objects.filter(subscribing_open=True)
-        conflicts = []
-        for i, slot_1 in enumerate(slots):
-            for slot_2 in slots[i + 1 :]:
-                if slot_1.activity == slot_2.activity:
-                    conflicts.append((slot_1, slot_2))
-        base_qs = models.ActivityChoicesModel.objects.filter(
-            accepted=True,
-            participant__is_registered=True,
-            participant__user__is_active=True,
-        )
-        errors = []
+        conflicts = self.get_slot_intervals().same_activity_pairs()
+        by_slot, _ = self.get_accepted_participants()
+        no_one: Set[int] = set()
+        duplicates = []
         for slot_1, slot_2 in conflicts:
-            participants_1 = {x.participant for x in base_qs.filter(slot=slot_1)}
-            participants_2 = {x.participant for x in base_qs.filter(slot=slot_2)}
-            intersection = participants_1.intersection(participants_2)
+            intersection = by_slot.get(slot_1.id, no_one) & by_slot.get(slot_2.id, no_one)
             if intersection:
-                errors.append(
-                    '{} inscrit aux créneaux "{}" et  "{}" de l\'activité "{}"'.format(
-                        ", ".join(self.url_participant(x) for x in intersection),
-                        self.url_slot(slot_1),
-                        self.url_slot(slot_2),
-                        self.url_activity(slot_1.activity),
-                    )
-                )
+                duplicates.append((sorted(intersection), slot_1, slot_2))
+
+        participants = self.load_participants(id for ids, _, _ in duplicates for id in ids)
+        errors = [
+            '{} inscrit aux créneaux "{}" et  "{}" de l\'activité "{}"'.format(
+                ", ".join(self.url_participant(participants[id]) for id in ids),
+                self.url_slot(slot_1),
+                self.url_slot(slot_2),
+                self.url_activity(slot_1.activity),
+            )
+            for ids, slot_1, slot_2 in duplicates
+        ]
 
         if errors:
             return self.format_error("Des participants sont inscrits plusieurs fois à la même activité&nbsp;:", errors)
         return self.format_ok("Aucun inscrit plusieurs fois à une même activité")
 
+    @cached_check("activities", "slots")
     def check_planning_slots_nb(self) -> str:
         """Vérification du planning:
         Vérifie que toutes les activités ont le bon nombre de créneaux
         dans le planning"""
         errors = []
-        activities = models.ActivityModel.objects.filter(display=True, year=get_year())
-        for activity in activities:
+        for entry in self.displayed_activities():
+            activity = entry.activity
             nb_wanted = activity.desired_slot_nb
-            nb_got = activity.slots().count()
+            nb_got = len(entry.listed_slots())
             if nb_wanted != nb_got:
                 errors.append(
                     '"{}" souhaite {} crénaux mais en a {} ({}).'.format(
@@ -367,14 +451,15 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             return self.format_error("Certaines activités ont trop/pas assez de crénaux&nbsp;:", errors)
         return self.format_ok("Toutes les activités (affichées) ont le bon nombre de crénaux")
 
+    @cached_check("activities", "slots")
     def check_planning_registration_matches(self) -> str:
         """Vérification du planning:
         Vérifie que les créneaux sur inscription correspondent aux activités
         sur inscription"""
         errors = []
-        activities = models.ActivityModel.objects.filter(display=True, year=get_year())
-        for activity in activities:
-            for slot in activity.slots():
+        for entry in self.displayed_activities():
+            activity = entry.activity
+            for slot in entry.listed_slots():
                 if slot.subscribing_open != activity.must_subscribe:
                     if slot.subscribing_open:
                         errors.append(
@@ -396,11 +481,12 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             'Toutes les activités (affichées) "sur inscription" n\'ont que des créneaux sur inscription (et réciproquement)'
         )
 
-    def check_planning_slot_conflicts(self, conflicts: Conflicts) -> str:
+    @cached_check("activities", "slots", "users")
+    def check_planning_slot_conflicts(self) -> str:
         """Vérification du planning:
         Vérifie qu'il n'y a pas d'orga gérant plusieurs activités simultanément"""
         errors = []
-        for slot1, slot2 in conflicts:
+        for slot1, slot2 in self.conflicts:
             conflict_text = "'{}' (le {} UTC) et '{}' (le {} UTC)".format(
                 self.url_slot(slot1),
                 django_date(slot1.start, "l à H:i"),
@@ -421,8 +507,42 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             "Aucun organisateur ne gère plusieurs créneaux simultanés.<br>(Ne compare que les orgas principaux, pas les éventuels additionels)"
         )
 
+    def format_pending(self) -> str:
+        """Mise en forme d'un check en cours de calcul"""
+        return '<li class="info">Vérification en cours...</li>'
+
+    # Checks displayed in the validations and the planning validations
+    CHECKS = [
+        "check_hidden_activities",
+        "check_activity_slots",
+        "check_repartition_participant_nb",
+        "check_repartition_no_simultaneaous_inscriptions",
+        "check_repartition_no_duplicate_inscription",
+        "check_planning_past_activities",
+        "check_planning_past_slots",
+        "check_planning_slot_without_activities",
+        "check_planning_slots_display",
+        "check_planning_slots_nb",
+        "check_planning_registration_matches",
+        "check_planning_slot_conflicts",
+    ]
+
     def validate_activity_allocation(self) -> Dict[str, Any]:
         settings = SiteSettings.load()
+        results = get_check_results(self, self.CHECKS)
+        timings = get_timings(self.CHECKS)
+
+        def check(name: str) -> str:
+            result = results[name]
+            if result is None:
+                return self.format_pending()
+            if not timings.get(name):
+                return result
+            # Measures of the run that computed the (possibly cached) result, for the whole check
+            return result + '<li class="info"><small>{} : {}</small></li>'.format(
+                name, format_timing(timings[name][-1])
+            )
+
         validations = '<ul class="messagelist">'
 
         # validate global settings
@@ -441,15 +561,13 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
                 )
             )
 
-        conflicts = self.get_conflicts()
-
         # longer validations
-        hidden = self.check_hidden_activities()
+        hidden = check("check_hidden_activities")
         validations += hidden
-        validations += self.check_activity_slots()
-        validations += self.check_repartition_participant_nb()
-        validations += self.check_repartition_no_simultaneaous_inscriptions(conflicts)
-        validations += self.check_repartition_no_duplicate_inscription()
+        validations += check("check_activity_slots")
+        validations += check("check_repartition_participant_nb")
+        validations += check("check_repartition_no_simultaneaous_inscriptions")
+        validations += check("check_repartition_no_duplicate_inscription")
 
         if settings.discord_link:
             validations += self.format_ok("Le lien du discord est renseigné")
@@ -473,13 +591,13 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
                 "Le planning n'est pas affiché ({})".format(self.url_parameters("display_planning"))
             )
         planning_validations += hidden
-        planning_validations += self.check_planning_past_activities()
-        planning_validations += self.check_planning_past_slots()
-        planning_validations += self.check_planning_slot_without_activities()
-        planning_validations += self.check_planning_slots_display()
-        planning_validations += self.check_planning_slots_nb()
-        planning_validations += self.check_planning_registration_matches()
-        planning_validations += self.check_planning_slot_conflicts(conflicts)
+        planning_validations += check("check_planning_past_activities")
+        planning_validations += check("check_planning_past_slots")
+        planning_validations += check("check_planning_slot_without_activities")
+        planning_validations += check("check_planning_slots_display")
+        planning_validations += check("check_planning_slots_nb")
+        planning_validations += check("check_planning_registration_matches")
+        planning_validations += check("check_planning_slot_conflicts")
 
         return {
             "django_version": VERSION,
@@ -490,16 +608,41 @@ class AdminView(SuperuserRequiredMixin, TemplateView):
             "validation_errors": '<li class="error">' in validations,
             "planning_validation": planning_validations,
             "planning_validation_errors": '<li class="error">' in planning_validations,
+            # False while some checks run in the background
+            "validation_done": None not in results.values(),
         }
 
     def get_context_data(self, *args, **kwargs) -> Dict[str, str]:
         context = super().get_context_data(*args, **kwargs)
         context["metrics"] = self.get_metrics()
+        metrics_timings = get_timings(["get_metrics"]).get("get_metrics")
+        if metrics_timings:
+            context["metrics_timing"] = format_timing(metrics_timings[-1])
         context.update(get_planning_context())
         context.update(self.validate_activity_allocation())
         return context
 
 
+class AdminValidationView(AdminView):
+    """Résultats des vérifications de la page admin,
+    récupérés par admin.html tant que certaines tournent en arrière-plan"""
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        validation = self.validate_activity_allocation()
+        return JsonResponse(
+            {
+                key: validation[key]
+                for key in (
+                    "validations",
+                    "validation_errors",
+                    "planning_validation",
+                    "planning_validation_errors",
+                    "validation_done",
+                )
+            }
+        )
+
+
 ID_PARTICIPANT = "id_participant"
 ID_CRENEAU = "id_créneau"
 OBTENU = "obtenu"
@@ -539,24 +682,37 @@ class CSV_UploadView(SuperuserRequiredMixin, FormView):
         else:
             data = csv
         # 3 - Check that the data is sensible (valid ids)
+        participant_ids = set(models.ParticipantModel.objects.values_list("id", flat=True))
+        slot_ids = set(models.SlotModel.objects.values_list("id", flat=True))
+        choices = {
+            (participant, slot): (choice_id, accepted)
+            for choice_id, participant, slot, accepted in models.ActivityChoicesModel.objects.values_list(
+                "id", "participant_id", "slot_id", "accepted"
+            )
+        }
         invalid_id_p = set()
         invalid_id_c = set()
         invalid_pair = set()
+        obtained = set()
         for id_p, id_c in data:
             try:
-                participant = models.ParticipantModel.objects.get(id=int(id_p))
-            except (ValueError, models.ParticipantModel.DoesNotExist):
+                participant: Optional[int] = int(id_p)
+            except ValueError:
+                participant = None
+            if participant not in participant_ids:
                 invalid_id_p.add(id_p)
                 participant = None
             try:
-                slot = models.SlotModel.objects.get(id=int(id_c))
-            except (ValueError, models.SlotModel.DoesNotExist):
+                slot: Optional[int] = int(id_c)
+            except ValueError:
+                slot = None
+            if slot not in slot_ids:
                 invalid_id_c.add(id_c)
                 slot = None
             if participant is not None and slot is not None:
-                try:
-                    _ = models.ActivityChoicesModel.objects.get(participant=participant, slot=slot)
-                except models.ActivityChoicesModel.DoesNotExist:
+                if (participant, slot) in choices:
+                    obtained.add((participant, slot))
+                else:
                     invalid_pair.add((id_p, id_c))
         if invalid_id_p or invalid_id_c or invalid_pair:
             messages.error(self.request, "Le fichier contient des erreurs:")
@@ -574,15 +730,16 @@ class CSV_UploadView(SuperuserRequiredMixin, FormView):
                 )
             return super().form_invalid(form)
         # 4- Update the table accordingly
-        total_changes = 0
-        for choice in models.ActivityChoicesModel.objects.all():
-            accepted = [str(choice.participant.id), str(choice.slot.id)] in data
-            if accepted != choice.accepted:
-                choice.accepted = accepted
-                total_changes += 1
-                choice.save()
+        changes = [
+            models.ActivityChoicesModel(id=choice_id, accepted=pair in obtained)
+            for pair, (choice_id, accepted) in choices.items()
+            if accepted != (pair in obtained)
+        ]
+        with transaction.atomic():
+            models.ActivityChoicesModel.objects.bulk_update(changes, ["accepted"], batch_size=500)
+        invalidate_checks("choices")
         messages.success(
-            self.request, "Répartition importée avec succès: {} valeurs ont été changés".format(total_changes)
+            self.request, "Répartition importée avec succès: {} valeurs ont été changés".format(len(changes))
         )
         return super().form_valid(form)
 
@@ -591,6 +748,46 @@ class CSV_UploadView(SuperuserRequiredMixin, FormView):
         return super().form_invalid(form)
 
 
+class AllocationView(SuperuserRequiredMixin, TemplateView):
+    """Calcule automatiquement la répartition des activités
+    GET affiche une page de confirmation, la répartition est faite par le POST de son formulaire"""
+
+    template_name = "allocation.html"
+    pattern_name = "admin_pages:index"
+
+    def inscriptions_open(self) -> bool:
+        if SiteSettings.load().activity_inscriptions_open:
+            messages.error(
+                self.request, "Les inscriptions aux activités sont encore ouvertes. Fermez les avant la répartition"
+            )
+            return True
+        return False
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if self.inscriptions_open():
+            return HttpResponseRedirect(reverse(self.pattern_name))
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if self.inscriptions_open():
+            return HttpResponseRedirect(reverse(self.pattern_name))
+        result = ActivityAllocator().save()
+        messages.success(
+            request,
+            "Répartition effectuée: {} souhaits obtenus sur {} ({} participants, dont {} sans activité). "
+            "{} valeurs ont été changées.".format(
+                result.granted, result.wishes, result.participants, result.unsatisfied, result.changes
+            ),
+        )
+        if result.cancelled_slots:
+            messages.warning(
+                request,
+                "Créneaux ignorés faute d'atteindre leur minimum de participants: "
+                + ", ".join(str(slot) for slot in result.cancelled_slots),
+            )
+        return HttpResponseRedirect(reverse(self.pattern_name))
+
+
 # ==============================
 # DB Export Views
 # ==============================
@@ -599,6 +796,7 @@ class CSV_UploadView(SuperuserRequiredMixin, FormView):
 class ExportActivities(SuperuserRequiredMixin, CSVWriteView):
     filename = "activites_interludes"
     model = models.ActivityModel
+    streaming = True
     fields = [
         # The key is "host_id" but listed as "host" in auto-found field names
         # which leads to an error...
@@ -651,30 +849,29 @@ class ExportSlots(SuperuserRequiredMixin, CSVWriteView):
         "Durée activité",
     ]
 
-    def get_rows(self):
-        slots = models.SlotModel.objects.all()
-        rows = []
-        for slot in slots:
-            rows.append(
-                [
-                    slot.id,
-                    str(slot),
-                    slot.start,
-                    slot.room,
-                    slot.subscribing_open,
-                    slot.on_planning,
-                    slot.on_activity,
-                    Colors(slot.color).name,
-                    slot.duration,
-                    slot.activity.duration,
-                ]
-            )
-        return rows
+    streaming = True
+
+    def iter_rows(self):
+        slots = models.SlotModel.objects.select_related("activity")
+        for slot in slots.iterator(chunk_size=self.chunk_size):
+            yield [
+                slot.id,
+                str(slot),
+                slot.start,
+                slot.room,
+                slot.subscribing_open,
+                slot.on_planning,
+                slot.on_activity,
+                Colors(slot.color).name,
+                slot.duration,
+                slot.activity.duration,
+            ]
 
 
 class ExportParticipants(SuperuserRequiredMixin, CSVWriteView):
     school: Optional[ENS] = None
     filename = "participants_interludes"
+    streaming = True
     headers = [
         ID_PARTICIPANT,
         "mail",
@@ -705,51 +902,57 @@ class ExportParticipants(SuperuserRequiredMixin, CSVWriteView):
         "Compte clipper",
     ]
 
-    def get_filename(self):
+    def get_filename(self) -> str:
         if self.school is None:
             return super().get_filename()
         return "participants_" + self.school.label.lower().replace(" ", "_").replace("ens_", "")
 
-    def get_rows(self):
+    def get_values(self) -> QuerySet[models.ParticipantModel]:
         profiles = models.ParticipantModel.objects.filter(is_registered=True, user__is_active=True)
         if self.school is not None:
             profiles = profiles.filter(school=self.school)
-        rows = []
-        for profile in profiles:
-            rows.append(
-                [
-                    profile.id,
-                    profile.user.email,
-                    profile.user.first_name,
-                    profile.user.last_name,
-                    profile.get_school_display(),
-                    profile.sleeps,
-                    # profile.mug,
-                    profile.nb_meals(),
-                    profile.meal_friday_evening,
-                    profile.meal_saturday_morning,
-                    profile.meal_saturday_midday,
-                    profile.meal_saturday_evening,
-                    profile.meal_sunday_morning,
-                    profile.meal_sunday_midday,
-                    profile.meal_sunday_evening,
-                    profile.option1,
-                    profile.option2,
-                    profile.option3,
-                    profile.option4,
-                    profile.option5,
-                    profile.paid,
-                    profile.cost(),
-                    profile.amount_paid,
-                    profile.nb_murder,
-                    profile.extra_contact,
-                    profile.murder_comment,
-                    profile.comment,
-                    hasattr(profile.user, "clipper_account"),
-                ]
+        costs = models.ParticipantModel.cost_expressions(SiteSettings.load())
+        return (
+            profiles.select_related("user", "user__clipper_account")
+            .annotate(
+                total_cost=costs["cost"],
+                school_label=Case(*(When(school=ens, then=Value(str(ens.label))) for ens in ENS), default=Value("")),
             )
-        rows.sort(key=lambda x: (x[4], x[3], x[2]))  # sort by school, last_name, first_name
-        return rows
+            .order_by("school_label", "user__last_name", "user__first_name", "id")
+        )
+
+    def iter_rows(self) -> Iterator[List[Any]]:
+        for profile in self.get_values().iterator(chunk_size=self.chunk_size):
+            yield [
+                profile.id,
+                profile.user.email,
+                profile.user.first_name,
+                profile.user.last_name,
+                profile.get_school_display(),
+                profile.sleeps,
+                # profile.mug,
+                profile.nb_meals(),
+                profile.meal_friday_evening,
+                profile.meal_saturday_morning,
+                profile.meal_saturday_midday,
+                profile.meal_saturday_evening,
+                profile.meal_sunday_morning,
+                profile.meal_sunday_midday,
+                profile.meal_sunday_evening,
+                profile.option1,
+                profile.option2,
+                profile.option3,
+                profile.option4,
+                profile.option5,
+                profile.paid,
+                money(profile.total_cost),  # type: ignore  # annotated by get_values
+                profile.amount_paid,
+                profile.nb_murder,
+                profile.extra_contact,
+                profile.murder_comment,
+                profile.comment,
+                hasattr(profile.user, "clipper_account"),
+            ]
 
 
 class ExportActivityChoices(SuperuserRequiredMixin, CSVWriteView):
@@ -765,23 +968,22 @@ class ExportActivityChoices(SuperuserRequiredMixin, CSVWriteView):
         ID_CRENEAU,
     ]
 
-    def get_rows(self):
-        activities = models.ActivityChoicesModel.objects.all()
-        rows = []
-        for act in activities:
-            if act.participant.is_registered and act.participant.user.is_active:
-                rows.append(
-                    [
-                        act.participant.id,
-                        str(act.participant),
-                        act.participant.user.email,
-                        act.priority,
-                        act.accepted,
-                        str(act.slot),
-                        act.slot.id,
-                    ]
-                )
-        return rows
+    streaming = True
+
+    def iter_rows(self):
+        choices = models.ActivityChoicesModel.objects.filter(
+            participant__is_registered=True, participant__user__is_active=True
+        ).select_related("participant__user", "slot__activity")
+        for act in choices.iterator(chunk_size=self.chunk_size):
+            yield [
+                act.participant.id,
+                str(act.participant),
+                act.participant.user.email,
+                act.priority,
+                act.accepted,
+                str(act.slot),
+                act.slot.id,
+            ]
 
 
 # ==============================
@@ -795,39 +997,48 @@ class SendEmailBase(SuperuserRequiredMixin, RedirectView):
     pattern_name = "admin_pages:index"
     from_address: Optional[str] = None  # defaults to DEFAULT_FROM_EMAIL setting
 
-    def send_emails(self) -> None:
+    def send_emails(self) -> Optional[EmailBatch]:
+        """Ajoute les emails à la file d'envoi, renvoie None si rien n'a été envoyé"""
         raise NotImplementedError("{}.send_emails isn't implemented".format(self.__class__.__name__))
 
     def get_redirect_url(self, *args, **kwargs):
         settings = SiteSettings.load()
         if settings.allow_mass_mail:
-            self.send_emails()
+            batch = self.send_emails()
+            if batch is not None:
+                return reverse("admin_pages:email_batch", args=[batch.id])
         else:
             messages.error(self.request, "L'envoi de mail de masse est désactivé dans les réglages")
         return reverse(self.pattern_name)
 
 
-# Subject, Message, From, To
-EMAIL = Tuple[str, str, Optional[str], List[str]]
-
-
 class SendUserEmail(SendEmailBase):
     """Envoie aux utilisateurs leur repartition d'activité"""
 
     def get_emails(self) -> List[EMAIL]:
-        """genere les mails a envoyer"""
+        """genere les mails a envoyer
+        Tous les choix sont chargés en une requête puis regroupés par participant"""
         participants = models.ParticipantModel.objects.filter(is_registered=True, user__is_active=True)
-        emails = []
+        requested: Dict[int, int] = {}
+        accepted: Dict[int, List[models.ActivityChoicesModel]] = {}
+        choices = models.ActivityChoicesModel.objects.filter(
+            participant__is_registered=True, participant__user__is_active=True
+        ).select_related("slot__activity")
+        for choice in choices:
+            requested[choice.participant_id] = requested.get(choice.participant_id, 0) + 1
+            if choice.accepted:
+                accepted.setdefault(choice.participant_id, []).append(choice)
+
+        emails: List[EMAIL] = []
         settings = SiteSettings.load()
-        for participant in participants:
-            my_choices = models.ActivityChoicesModel.objects.filter(participant=participant)
-            message: str = render_to_string(
-                "email/user.html",
+        template = get_template("email/user.html")
+        for participant in participants.select_related("user"):
+            message: str = template.render(
                 {
                     "user": participant.user,
                     "settings": settings,
-                    "requested_activities_nb": my_choices.count(),
-                    "my_choices": my_choices.filter(accepted=True),
+                    "requested_activities_nb": requested.get(participant.id, 0),
+                    "my_choices": accepted.get(participant.id, []),
                 },
             )
             emails.append(
@@ -840,26 +1051,35 @@ class SendUserEmail(SendEmailBase):
             )
         return emails
 
-    def send_emails(self) -> None:
+    def send_emails(self) -> Optional[EmailBatch]:
         settings = SiteSettings.load()
         if settings.user_notified:
             messages.error(
                 self.request,
                 "Les participants ont déjà reçu un mail annonçant la répartition. Modifiez les réglages pour en envoyer un autre",
             )
-            return
+            return None
         settings.user_notified = now()
         settings.save()
         emails = self.get_emails()
 
-        nb_sent = send_mass_mail(emails, fail_silently=False)
-        mail_admins(
+        batch = outbox.enqueue(
             "Emails de répartition envoyés aux participants",
-            "Les participants ont reçu un mail leur communiquant la répartition des activités\n"
-            "Nombre total de mail envoyés: {}\n\n"
-            "{}".format(nb_sent, site_settings.EMAIL_SIGNATURE),
+            "Les participants ont reçu un mail leur communiquant la répartition des activités",
+            emails,
         )
-        messages.success(self.request, "{} mails envoyés aux utilisateurs".format(nb_sent))
+        messages.success(self.request, "{} mails aux utilisateurs ajoutés à la file d'envoi".format(len(emails)))
+        return batch
+
+
+def group_by_host(activities: Iterable[models.ActivityModel]) -> Dict[str, List[models.ActivityModel]]:
+    """Regroupe les activités par email d'organisateur
+    To avoid sending too many email, all activities with the same
+    host_email get sent in a single email."""
+    by_host: Dict[str, List[models.ActivityModel]] = {}
+    for activity in activities:
+        by_host.setdefault(activity.host_email, []).append(activity)
+    return by_host
 
 
 class SendOrgaEmail(SendEmailBase):
@@ -871,19 +1091,13 @@ class SendOrgaEmail(SendEmailBase):
     def get_emails(self) -> List[EMAIL]:
         """genere les mails a envoyer"""
         activities = models.ActivityModel.objects.filter(display=True, communicate_participants=True)
-        emails = []
+        emails: List[EMAIL] = []
         settings = SiteSettings.load()
-        seen = set()
-        for activity in activities:
-            # To avoid sending too many email, all activities with the same
-            # host_email get sent in a single email.
-            if activity.host_email in seen:
-                continue
-            seen.add(activity.host_email)
-            message: str = render_to_string(
-                "email/orga.html",
+        template = get_template("email/orga.html")
+        for host_email, host_activities in group_by_host(prefetch_slots(activities, participants=True)).items():
+            message: str = template.render(
                 {
-                    "activities": activities.filter(host_email=activity.host_email),
+                    "activities": host_activities,
                     "settings": settings,
                 },
             )
@@ -892,31 +1106,30 @@ class SendOrgaEmail(SendEmailBase):
                     site_settings.USER_EMAIL_SUBJECT_PREFIX + "Liste d'inscrits à vos activités",  # subject
                     message,
                     self.from_address,  # From:
-                    [activity.host_email],  # To:
+                    [host_email],  # To:
                 )
             )
         return emails
 
-    def send_emails(self) -> None:
+    def send_emails(self) -> Optional[EmailBatch]:
         settings = SiteSettings.load()
         if settings.orga_notified:
             messages.error(
                 self.request,
                 "Les orgas ont déjà reçu un mail avec leur listes d'inscrits. Modifiez les réglages pour en envoyer un autre",
             )
-            return
+            return None
         settings.orga_notified = now()
         settings.save()
         emails = self.get_emails()
 
-        nb_sent = send_mass_mail(emails, fail_silently=False)
-        mail_admins(
+        batch = outbox.enqueue(
             "Listes d'inscrits envoyés aux orgas",
-            "Les mails communiquant aux organisateurs leur listes d'inscrit ont été envoyés\n"
-            "Nombre total de mail envoyés: {}\n\n"
-            "{}".format(nb_sent, site_settings.EMAIL_SIGNATURE),
+            "Les mails communiquant aux organisateurs leur listes d'inscrit ont été envoyés",
+            emails,
         )
-        messages.success(self.request, "{} mails envoyés aux orgas".format(nb_sent))
+        messages.success(self.request, "{} mails aux orgas ajoutés à la file d'envoi".format(len(emails)))
+        return batch
 
 
 class SendOrgaPlanningEmail(SendEmailBase):
@@ -927,19 +1140,13 @@ class SendOrgaPlanningEmail(SendEmailBase):
     def get_emails(self) -> List[EMAIL]:
         """genere les mails a envoyer"""
         activities = models.ActivityModel.objects.filter(display=True)
-        emails = []
+        emails: List[EMAIL] = []
         settings = SiteSettings.load()
-        seen = set()
-        for activity in activities:
-            # To avoid sending too many email, all activities with the same
-            # host_email get sent in a single email.
-            if activity.host_email in seen:
-                continue
-            seen.add(activity.host_email)
-            message: str = render_to_string(
-                "email/orga_planning.html",
+        template = get_template("email/orga_planning.html")
+        for host_email, host_activities in group_by_host(prefetch_slots(activities)).items():
+            message: str = template.render(
                 {
-                    "activities": activities.filter(host_email=activity.host_email),
+                    "activities": host_activities,
                     "settings": settings,
                 },
             )
@@ -948,31 +1155,30 @@ class SendOrgaPlanningEmail(SendEmailBase):
                     site_settings.USER_EMAIL_SUBJECT_PREFIX + "Planning interludes",  # subject
                     message,
                     self.from_address,  # From:
-                    [activity.host_email],  # To:
+                    [host_email],  # To:
                 )
             )
         return emails
 
-    def send_emails(self) -> None:
+    def send_emails(self) -> Optional[EmailBatch]:
         settings = SiteSettings.load()
         if settings.orga_planning_notified:
             messages.error(
                 self.request,
                 "Les orgas ont déjà reçu un mail avec leur créneaux. Modifiez les réglages pour en envoyer un autre",
             )
-            return
+            return None
         settings.orga_planning_notified = now()
         settings.save()
         emails = self.get_emails()
 
-        nb_sent = send_mass_mail(emails, fail_silently=False)
-        mail_admins(
+        batch = outbox.enqueue(
             "Créneaux envoyés aux organisateurs d'activités",
-            "Les mails communiquant aux organisateurs les créneaux de leurs activités ont été envoyés.\n"
-            "Nombre total de mail envoyés: {}\n\n"
-            "{}".format(nb_sent, site_settings.EMAIL_SIGNATURE),
+            "Les mails communiquant aux organisateurs les créneaux de leurs activités ont été envoyés.",
+            emails,
         )
-        messages.success(self.request, "{} mails envoyés aux orgas".format(nb_sent))
+        messages.success(self.request, "{} mails aux orgas ajoutés à la file d'envoi".format(len(emails)))
+        return batch
 
 
 class NewEmail(SuperuserRequiredMixin, FormView):
@@ -1028,27 +1234,21 @@ class NewEmail(SuperuserRequiredMixin, FormView):
         # It should return an HttpResponse.
         if not self.sending_allowed():
             messages.error(self.request, "L'envoi de mail de masse est désactivé dans les réglages")
-        else:
-            dest = form.cleaned_data["dest"]
-            subject = form.cleaned_data["subject"]
-            text = form.cleaned_data["text"]
-            emails = []
-            # Use a set to avoid possible duplications
-            for to_addr in set(self.get_emails(dest)):
-                emails.append([subject, text, self.from_address, [to_addr]])
-            nb_sent = send_mass_mail(emails, fail_silently=False)  # type: ignore
-            mail_admins(
-                "Email envoyé",
-                "Un email a été envoyé à {}.\nNombre total de mail envoyés: {}\n\nSujet : {}\n\n{}\n\n{}".format(
-                    Recipients(dest).label,
-                    nb_sent,
-                    subject,
-                    text,
-                    site_settings.EMAIL_SIGNATURE,
-                ),
-            )
-            messages.success(self.request, "{} mails envoyés".format(nb_sent))
-        return super().form_valid(form)
+            return super().form_valid(form)
+        dest = form.cleaned_data["dest"]
+        subject = form.cleaned_data["subject"]
+        text = form.cleaned_data["text"]
+        emails: List[EMAIL] = []
+        # Use a set to avoid possible duplications
+        for to_addr in set(self.get_emails(dest)):
+            emails.append((subject, text, self.from_address, [to_addr]))
+        batch = outbox.enqueue(
+            "Email envoyé",
+            "Un email a été envoyé à {}.\n\nSujet : {}\n\n{}\n".format(Recipients(dest).label, subject, text),
+            emails,
+        )
+        messages.success(self.request, "{} mails ajoutés à la file d'envoi".format(len(emails)))
+        return HttpResponseRedirect(reverse("admin_pages:email_batch", args=[batch.id]))
 
     def get_context_data(self, *args, **kwargs) -> Dict[str, Any]:
         """ajoute l'email d'envoie aux données contextuelles"""
@@ -1070,5 +1270,39 @@ class NewEmail(SuperuserRequiredMixin, FormView):
         return HttpResponseRedirect(self.get_success_url())
 
 
+class EmailBatchView(SuperuserRequiredMixin, DetailView):
+    """Avancement d'un envoi d'emails"""
+
+    model = EmailBatch
+    template_name = "email_batch.html"
+    context_object_name = "batch"
+
+    def get_context_data(self, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        counts = outbox.batch_counts([self.object.id])[self.object.id]
+        total = sum(counts.values())
+        context.update(counts)
+        context["total"] = total
+        context["progress"] = 100 if total == 0 else (100 * (counts["sent"] + counts["failed"])) // total
+        context["failures"] = self.object.emails.filter(status=OutboxEmail.Status.FAILED)
+        context["retrying"] = self.object.emails.filter(status=OutboxEmail.Status.PENDING, attempts__gt=0)
+        context["outbox_thread"] = site_settings.OUTBOX_THREAD
+        return context
+
+
 class SiteInfo(SuperuserRequiredMixin, TemplateView):
     template_name = "info.html"
+
+    def get_context_data(self, *args, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(*args, **kwargs)
+        context["timings"] = [
+            {
+                "name": name,
+                "last": history[-1],
+                "history": list(reversed(history)),
+                "mean": sum(timing["duration"] for timing in history) / len(history),
+            }
+            for name, history in get_timings(["get_metrics"] + AdminView.CHECKS).items()
+            if history
+        ]
+        return context
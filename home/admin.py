@@ -14,6 +14,7 @@ class ActivityModelAdmin(ExportCsvMixin):
     """option d'affichage des activités dans la vue django admin"""
 
     filename = "export_activites.csv"
+    csv_export_streaming = True
     list_display = (
         "title",
         "host_name",
@@ -143,6 +144,7 @@ class SlotModelAdmin(ExportCsvMixin):
     """option d'affichage des créneaux dans la vue d'admin"""
 
     filename = "export_slots.csv"
+    csv_export_streaming = True
     csv_export_fields = [
         "activity_id",
         "title",
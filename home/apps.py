@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class HomeConfig(AppConfig):
     name = "home"
     verbose_name = "site principal"
+
+    def ready(self) -> None:
+        from home import signals  # noqa: F401
+        from shared.middleware import connect_data_versions
+
+        connect_data_versions()
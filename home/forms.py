@@ -1,3 +1,5 @@
+from typing import Any, Dict, List, Optional, Tuple
+
 from django import forms
 from django.core.exceptions import ValidationError
 
@@ -62,21 +64,74 @@ class InscriptionForm(FormRenderMixin, forms.ModelForm):
         return participant
 
 
-class ActivityForm(FormRenderMixin, forms.ModelForm):
-    class Meta:
-        model = models.ActivityChoicesModel
-        fields = ("slot",)
-        labels = {"slot": ""}
+class SlotChoices:
+    """Créneaux ouverts aux inscriptions, chargés une seule fois
+    et partagés par tous les formulaires d'un formset"""
+
+    def __init__(self) -> None:
+        slots = models.SlotModel.objects.filter(subscribing_open=True).select_related("activity")
+        self.slots: Dict[str, models.SlotModel] = {str(slot.pk): slot for slot in slots}
+        self.choices: List[Tuple[str, str]] = [("", "---------")]
+        self.choices.extend((pk, str(slot)) for pk, slot in self.slots.items())
+
+
+class SlotChoiceField(forms.ChoiceField):
+    """Choix d'un créneau parmi des SlotChoices, sans requête ni au rendu ni à la validation"""
+
+    default_error_messages = {"invalid_choice": forms.ModelChoiceField.default_error_messages["invalid_choice"]}
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.slots: Dict[str, models.SlotModel] = dict()
+
+    def set_slot_choices(self, slot_choices: SlotChoices) -> None:
+        self.slots = slot_choices.slots
+        self.choices = slot_choices.choices
 
-    def __init__(self, *args, **kwargs):
+    def prepare_value(self, value: Any) -> Any:
+        if isinstance(value, models.SlotModel):
+            return value.pk
+        return value
+
+    def to_python(self, value: Any) -> Optional[models.SlotModel]:
+        if value in self.empty_values:
+            return None
+        slot = self.slots.get(str(value))
+        if slot is None:
+            raise ValidationError(self.error_messages["invalid_choice"], code="invalid_choice")
+        return slot
+
+    def validate(self, value: Any) -> None:
+        # to_python already checked the value is one of the choices
+        forms.Field.validate(self, value)
+
+    def has_changed(self, initial: Any, data: Any) -> bool:
+        if self.disabled:
+            return False
+        initial_value = self.prepare_value(initial)
+        return str(initial_value if initial_value is not None else "") != str(data if data is not None else "")
+
+
+class ActivityForm(FormRenderMixin, forms.Form):
+    slot = SlotChoiceField(label="")
+
+    def __init__(self, *args, slot_choices: Optional[SlotChoices] = None, **kwargs):
         super(ActivityForm, self).__init__(*args, **kwargs)
-        slots = models.SlotModel.objects.filter(subscribing_open=True)
-        self.fields["slot"].queryset = slots  # type: ignore
+        self.fields["slot"].set_slot_choices(slot_choices or SlotChoices())  # type: ignore
 
 
 class BaseActivityFormSet(forms.BaseFormSet):
     """Form set that fails if duplicate activities"""
 
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.slot_choices = SlotChoices()
+
+    def get_form_kwargs(self, index: Optional[int]) -> Dict[str, Any]:
+        kwargs = super().get_form_kwargs(index)
+        kwargs["slot_choices"] = self.slot_choices
+        return kwargs
+
     def clean(self):
         """Checks for duplicate activities"""
         super().clean()
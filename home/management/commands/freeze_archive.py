@@ -0,0 +1,187 @@
+import json
+import os
+import posixpath
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, cast
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import QuerySet
+from django.template.response import TemplateResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+from home.models import ActivityModel, SlotModel
+from home.planning import build_planning, planning_items
+from pages.models import HTMLPageModel
+from pages.views import PREBUILT_PAGES, HTMLPageView
+from site_settings.models import SiteSettings, get_year
+
+# Absolute urls in quoted attributes and strings of the rendered pages
+URL = re.compile(r"(?<=[\"'])/[^\"'\s<>]*(?=[\"'])")
+# Urls of the files used by a stylesheet
+CSS_URL = re.compile(r"url\(\s*[\"']?([^\"')]+)[\"']?\s*\)")
+
+
+class ArchivePageView(HTMLPageView):
+    """Page publique rendue pour l'archive (sans les liens d'inscription et de connexion)
+    N'affiche que les activités et créneaux de l'année archivée"""
+
+    extra_context = {"archive": True}
+    year = 0  # set by as_view
+
+    def get_activities(self) -> QuerySet[ActivityModel]:
+        return super().get_activities().filter(year=self.year)
+
+    def get_planning_context(self) -> Dict[str, Any]:
+        context = super().get_planning_context()
+        context["planning"] = context["planning"].filter(activity__year=self.year)
+        return context
+
+
+class Command(BaseCommand):
+    help = (
+        "Fige les pages publiques d'une édition (pages, activités et créneaux affichés de son année) "
+        "en HTML statique dans home/static/archive/<année>, avec une copie des fichiers qu'elles utilisent"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year",
+            type=int,
+            default=None,
+            help="Année (scolaire) de l'édition, celle de ses activités (par défaut l'année en cours)",
+        )
+        parser.add_argument(
+            "--output",
+            default=None,
+            help="Dossier de l'archive (par défaut home/static/archive/<année>)",
+        )
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Remplace le contenu d'une archive existante",
+        )
+        parser.add_argument(
+            "--jobs",
+            type=int,
+            default=4,
+            help="Nombre de pages rendues et de fichiers copiés en parallèle",
+        )
+
+    def handle(self, *args, year: Optional[int], output: Optional[str], overwrite: bool, jobs: int, **options):
+        site_settings = SiteSettings.load()
+        if year is None:
+            year = get_year()
+        if not ArchivePageView(year=year).get_activities().exists():
+            raise CommandError("Aucune activité affichée pour l'année {}".format(year))
+        if year != get_year():
+            self.stderr.write(
+                "Attention : les pages et réglages du site (dates, textes) sont ceux de l'édition en cours"
+            )
+
+        if output is None:
+            output = os.path.join(settings.BASE_DIR, "home", "static", "archive", str(year))
+        if os.path.isdir(output) and os.listdir(output):
+            if not overwrite:
+                raise CommandError("L'archive {} existe déjà, utilisez --overwrite pour la remplacer".format(output))
+            shutil.rmtree(output)
+        os.makedirs(output, exist_ok=True)
+
+        self.year = year
+        self.output = output
+        self.prefix = "{}archive/{}/".format(settings.STATIC_URL, year)
+        self.assets: Set[str] = set()
+
+        # Pages are named after their slug, the home page becomes index.html
+        slugs = {page["slug"] for page in PREBUILT_PAGES}
+        for page in HTMLPageModel.objects.all():
+            if page.visible:
+                slugs.add(page.slug)
+            else:
+                slugs.discard(page.slug)
+        self.pages: Dict[str, str] = {
+            reverse("html_page", kwargs={"slug": slug}) if slug else reverse("home"): (slug or "index") + ".html"
+            for slug in sorted(slugs)
+        }
+        self.links: Dict[str, str] = {path: self.prefix + name for path, name in self.pages.items()}
+        self.links[reverse("planning.json")] = self.prefix + "planning.json"
+
+        slots = SlotModel.objects.filter(on_planning=True, activity__year=year)
+        entries = build_planning(site_settings, slots.order_by("title").select_related("activity"))
+        with open(os.path.join(output, "planning.json"), "w", encoding="utf-8") as file:
+            json.dump({"items": planning_items(entries)}, file)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            rendered = list(executor.map(self.render_page, self.pages.items()))
+            failures = [path for path, ok in zip(self.pages, rendered) if not ok]
+            copied: Set[str] = set()
+            # Stylesheets add the files they use, copy until there are no new ones
+            while self.assets - copied:
+                batch = sorted(self.assets - copied)
+                copied.update(batch)
+                list(executor.map(self.copy_asset, batch))
+
+        self.stdout.write("{} page(s) et {} fichier(s) archivés dans {}".format(len(self.pages), len(copied), output))
+        if failures:
+            raise CommandError("Impossible de rendre les pages : {}".format(", ".join(failures)))
+
+    def archive_url(self, url: str) -> str:
+        """Url dans l'archive d'un lien de page, les fichiers statiques et media y sont copiés"""
+        path, sep, fragment = url.partition("#")
+        path = path.split("?")[0]
+        if path in self.links:
+            return self.links[path] + sep + fragment
+        if (path.startswith(settings.STATIC_URL) and not path.startswith(self.prefix)) or path.startswith(
+            settings.MEDIA_URL
+        ):
+            self.assets.add(path)
+            return self.prefix + "assets" + path + sep + fragment
+        return url
+
+    def render_page(self, item) -> bool:
+        path, name = item
+        slug = path.strip("/")
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        try:
+            response = cast(TemplateResponse, ArchivePageView.as_view(year=self.year)(request, slug=slug))
+            response.render()
+            if response.status_code != 200:
+                self.stderr.write("{} : erreur {}".format(path, response.status_code))
+                return False
+            content = URL.sub(lambda match: self.archive_url(match.group(0)), response.content.decode())
+        except Exception as error:
+            self.stderr.write("{} : {!r}".format(path, error))
+            return False
+        finally:
+            connections.close_all()
+        with open(os.path.join(self.output, name), "w", encoding="utf-8") as file:
+            file.write(content)
+        return True
+
+    def copy_asset(self, path: str) -> None:
+        if path.startswith(settings.MEDIA_URL):
+            source: Optional[str] = os.path.join(settings.MEDIA_ROOT, unquote(path[len(settings.MEDIA_URL) :]))
+        else:
+            source = finders.find(unquote(path[len(settings.STATIC_URL) :]))
+        if source is None or not os.path.isfile(source):
+            self.stderr.write("Fichier introuvable : {}".format(path))
+            return
+        target = os.path.join(self.output, "assets", unquote(path).lstrip("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(source, target)
+        if path.endswith(".css"):
+            # Relative urls still work as the folder structure is kept
+            with open(source, encoding="utf-8") as file:
+                urls: List[str] = CSS_URL.findall(file.read())
+            for url in urls:
+                url = url.split("#")[0].split("?")[0]
+                if url and not url.startswith(("/", "data:")) and "://" not in url:
+                    self.assets.add(posixpath.normpath(posixpath.join(posixpath.dirname(path), url)))
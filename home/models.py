@@ -1,6 +1,6 @@
 from datetime import datetime, time, timedelta
 from decimal import Decimal
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
 
 from django.db import models
 from django.forms import ValidationError
@@ -239,8 +239,12 @@ class ActivityModel(models.Model):
         """Returns the planning/display slug for this activity"""
         return "act-{}".format(self.id)
 
-    def slots(self) -> models.QuerySet["SlotModel"]:
-        """Returns a list of slots related to self"""
+    def slots(self) -> Union[List["SlotModel"], models.QuerySet["SlotModel"]]:
+        """Returns a list of slots related to self
+        Uses the slots loaded by home.planning.prefetch_slots if any"""
+        if hasattr(self, "listed_slots"):
+            slots: List[SlotModel] = self.listed_slots
+            return slots
         return SlotModel.objects.filter(activity=self, on_activity=True).order_by("start")
 
     def __str__(self):
@@ -309,13 +313,14 @@ class SlotModel(models.Model):
         return self.start <= other.end()
 
     @staticmethod
-    def relative_day(date: datetime) -> int:
+    def relative_day(date: datetime, settings: Optional[SiteSettings] = None) -> int:
         """Relative day to start.
         - friday   04:00 -> 03:59 = day 0
         - saturday 04:00 -> 03:59 = day 1
         - sunday   04:00 -> 03:59 = day 2
         returns 0 if no date_start is defined in settings"""
-        settings = SiteSettings.load()
+        if settings is None:
+            settings = SiteSettings.load()
         if settings.date_start:
             return (
                 date
@@ -329,9 +334,10 @@ class SlotModel(models.Model):
             return 0
 
     @staticmethod
-    def fake_date(date: datetime) -> Optional[datetime]:
+    def fake_date(date: datetime, settings: Optional[SiteSettings] = None) -> Optional[datetime]:
         """Fake day for display on the (single day planning)"""
-        settings = SiteSettings.load()
+        if settings is None:
+            settings = SiteSettings.load()
         if settings.date_start:
             time = date.timetz()
             offset = timedelta(0)
@@ -340,23 +346,23 @@ class SlotModel(models.Model):
             return datetime.combine(settings.date_start + offset, date.timetz())
         return None
 
-    def start_day(self) -> int:
+    def start_day(self, settings: Optional[SiteSettings] = None) -> int:
         """returns a day (0-2)"""
-        return self.relative_day(self.start)
+        return self.relative_day(self.start, settings)
 
-    def end_day(self) -> int:
+    def end_day(self, settings: Optional[SiteSettings] = None) -> int:
         """returns a day (0-2)"""
-        return self.relative_day(self.end())
+        return self.relative_day(self.end(), settings)
 
-    def days(self) -> List[int]:
+    def days(self, settings: Optional[SiteSettings] = None) -> List[int]:
         """List of all days (0-2) of this slot"""
-        return list(range(self.start_day(), self.end_day() + 1))
+        return list(range(self.start_day(settings), self.end_day(settings) + 1))
 
-    def planning_start(self) -> Optional[datetime]:
-        return self.fake_date(self.start)
+    def planning_start(self, settings: Optional[SiteSettings] = None) -> Optional[datetime]:
+        return self.fake_date(self.start, settings)
 
-    def planning_end(self) -> Optional[datetime]:
-        return self.fake_date(self.end())
+    def planning_end(self, settings: Optional[SiteSettings] = None) -> Optional[datetime]:
+        return self.fake_date(self.end(), settings)
 
     def __str__(self) -> str:
         return self.title.replace(self.TITLE_SPECIFIER, self.activity.title)
@@ -466,6 +472,44 @@ class ParticipantModel(models.Model):
 
     cost.short_description = "tarif"  # type: ignore
 
+    @staticmethod
+    def cost_expressions(settings: SiteSettings) -> Dict[str, models.Expression]:
+        """SQL equivalents of cost_entry, cost_sleep, cost_meals, cost_options and cost
+        to use in annotate() or aggregate(), prices are read from settings"""
+        output = models.DecimalField(max_digits=12, decimal_places=2)
+
+        def price(name: str) -> models.Expression:
+            return models.Case(
+                models.When(paid=True, then=models.Value(getattr(settings, "price_" + name + "_paid"))),
+                default=models.Value(getattr(settings, "price_" + name + "_unpaid")),
+                output_field=output,
+            )
+
+        def if_true(field: str, value: models.Expression) -> models.Expression:
+            return models.Case(
+                models.When(**{field: True}, then=value), default=models.Value(Decimal(0)), output_field=output
+            )
+
+        def total(values: List[models.Expression]) -> models.Expression:
+            result: models.Expression = models.Value(Decimal(0), output_field=output)
+            for value in values:
+                result = models.ExpressionWrapper(result + value, output_field=output)
+            return result
+
+        entry = price("entry")
+        sleep = if_true("sleeps", price("sleep"))
+        meals = total(
+            [if_true("meal_" + meal, price(meal + "_meal")) for meal in MEALS if getattr(settings, "meal_" + meal)]
+        )
+        options = total([if_true(option, price(option)) for option in OPTIONS if getattr(settings, option + "_enable")])
+        return {
+            "cost_entry": entry,
+            "cost_sleep": sleep,
+            "cost_meals": meals,
+            "cost_options": options,
+            "cost": total([entry, sleep, meals, options]),
+        }
+
     class Meta:
         verbose_name = "participant"
 
@@ -495,4 +539,23 @@ class ActivityChoicesModel(models.Model):
         verbose_name_plural = "choix d'activités"
 
 
-EmailUser.profile = property(lambda user: ParticipantModel.objects.get_or_create(user=user)[0])  # type: ignore
+def get_profile(user: EmailUser) -> ParticipantModel:
+    """Profil de participant de l'utilisateur, chargé une seule fois par objet utilisateur
+    (et donc par requête). S'il n'existe pas encore, renvoie un profil non enregistré
+    (pk None), créé à sa première sauvegarde"""
+    try:
+        return user.Utilisateur
+    except ParticipantModel.DoesNotExist:
+        profile = ParticipantModel(user=user)
+        # Later accesses reuse the same unsaved profile
+        EmailUser.Utilisateur.related.set_cached_value(user, profile)
+        return profile
+
+
+def profile_saved(profile: ParticipantModel) -> bool:
+    """Vrai si le profil (renvoyé par get_profile) est enregistré"""
+    # pk is typed as an int, but stays None until the first save
+    return getattr(profile, "pk", None) is not None
+
+
+EmailUser.profile = property(get_profile)  # type: ignore
@@ -0,0 +1,176 @@
+from datetime import date, datetime, time
+from heapq import heappop, heappush
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings as site_settings
+from django.core.cache import cache
+from django.db.models import Prefetch, QuerySet
+from django.template.defaultfilters import date as date_filter
+from django.utils.html import format_html
+from django.utils.timezone import get_current_timezone, localtime
+
+from home.models import ActivityChoicesModel, ActivityModel, SlotModel
+from shared.cache import bump_version, get_version
+from site_settings.models import SiteSettings
+
+# Version of the cached planning, bumped by home.signals when slots, activities or settings change
+PLANNING_VERSION = "planning"
+
+SlotPairs = List[Tuple[SlotModel, SlotModel]]
+
+
+class SlotIntervals:
+    """Index des créneaux par intervalle [début, fin]
+
+    Les fins sont calculées une seule fois (charger les créneaux avec
+    select_related("activity") pour éviter une requête par créneau)"""
+
+    def __init__(self, slots: Iterable[SlotModel]) -> None:
+        self.slots: List[SlotModel] = sorted(slots, key=lambda slot: (slot.start, slot.id))
+        self.ends: List[datetime] = [slot.end() for slot in self.slots]
+
+    def overlapping_pairs(self) -> SlotPairs:
+        """Paires de créneaux qui se chevauchent (cf SlotModel.conflicts), le premier
+        commençant avant le second. Balayage en O(n log n + nombre de paires)"""
+        pairs: SlotPairs = []
+        running: List[Tuple[datetime, int]] = []  # heap of (end, index) of slots that have started
+        for index, slot in enumerate(self.slots):
+            while running and running[0][0] < slot.start:
+                heappop(running)
+            for _, other in running:
+                pairs.append((self.slots[other], slot))
+            heappush(running, (self.ends[index], index))
+        return pairs
+
+    def same_activity_pairs(self) -> SlotPairs:
+        """Paires de créneaux d'une même activité"""
+        by_activity: Dict[int, List[SlotModel]] = {}
+        for slot in self.slots:
+            by_activity.setdefault(slot.activity_id, []).append(slot)
+        pairs: SlotPairs = []
+        for slots in by_activity.values():
+            for i, slot_1 in enumerate(slots):
+                for slot_2 in slots[i + 1 :]:
+                    pairs.append((slot_1, slot_2))
+        return pairs
+
+
+class PlanningEntry(NamedTuple):
+    """Un créneau du planning sur un jour, les créneaux sur plusieurs jours ont une entrée par jour
+
+    The planning displays all slots in a single day, using the timeline 'group' feature
+    to display days one under the other. Start and end are the fake dates on that day
+    (see SlotModel.fake_date), or the day boundary (04:00) for multi day slots."""
+
+    slot_id: int
+    activity_id: int
+    activity_slug: str
+    title: str
+    room: str
+    color: str
+    day: int
+    start: Optional[datetime]
+    end: Optional[datetime]
+
+
+def day_boundary(day: Optional[date]) -> Optional[datetime]:
+    """Start of a planning day (04:00)"""
+    if day is None:
+        return None
+    return datetime.combine(day, time(hour=4), get_current_timezone())
+
+
+def build_planning(settings: SiteSettings, slots: Optional[Iterable[SlotModel]] = None) -> List[PlanningEntry]:
+    """Entrées du planning, les réglages ne sont lus qu'une fois
+    Par défaut, les créneaux affichés sur le planning, triés par titre"""
+    if slots is None:
+        slots = SlotModel.objects.filter(on_planning=True).order_by("title").select_related("activity")
+    day_1 = day_boundary(settings.date_start)
+    day_2 = day_boundary(settings.date_2())
+    entries = []
+    for slot in slots:
+        end = slot.end()
+        first_day = SlotModel.relative_day(slot.start, settings)
+        last_day = SlotModel.relative_day(end, settings)
+        for day in range(first_day, last_day + 1):
+            entries.append(
+                PlanningEntry(
+                    slot_id=slot.id,
+                    activity_id=slot.activity_id,
+                    activity_slug=slot.activity.slug(),
+                    title=str(slot),
+                    room=slot.room or "",
+                    color=slot.color,
+                    day=day,
+                    start=SlotModel.fake_date(slot.start, settings) if day == first_day else day_1,
+                    end=SlotModel.fake_date(end, settings) if day == last_day else day_2,
+                )
+            )
+    return entries
+
+
+def planning_date(date: Optional[datetime]) -> str:
+    """Format a date for vis-timeline, in local time like the date template filter"""
+    if date is None:
+        return ""
+    return date_filter(localtime(date), "Y-m-d H:i:s")
+
+
+def planning_items(entries: Iterable[PlanningEntry]) -> List[Dict[str, Any]]:
+    """Éléments du planning affichés par vis-timeline (cf _planning.html)"""
+    return [
+        {
+            "content": format_html(
+                '<div style="background-color: yellow;"><a class="hidden" href="#{}"><div><strong>{}</strong><br>{}</div></a></div>',
+                entry.activity_slug,
+                entry.title,
+                entry.room,
+            ),
+            "title": format_html("<strong>{}</strong><br>{}", entry.title, entry.room),
+            "start": planning_date(entry.start),
+            "align": "left",
+            "group": entry.day,
+            "end": planning_date(entry.end),
+            "className": "color-{}".format(entry.color),
+        }
+        for entry in entries
+    ]
+
+
+def prefetch_slots(activities: QuerySet[ActivityModel], participants: bool = False) -> QuerySet[ActivityModel]:
+    """Charge les créneaux de chaque activité (activity.listed_slots, comme ActivityModel.slots)
+    et si participants est vrai, les choix obtenus de chaque créneau avec leur participant
+    (slot.accepted_choices, comme SlotModel.participants)"""
+    lookups: List[Prefetch] = [
+        Prefetch(
+            "slotmodel_set",
+            queryset=SlotModel.objects.filter(on_activity=True).order_by("start"),
+            to_attr="listed_slots",
+        )
+    ]
+    if participants:
+        lookups.append(
+            Prefetch(
+                "listed_slots__activitychoicesmodel_set",
+                queryset=ActivityChoicesModel.objects.filter(accepted=True).select_related("participant__user"),
+                to_attr="accepted_choices",
+            )
+        )
+    return activities.prefetch_related(*lookups)
+
+
+def get_planning_items() -> List[Dict[str, Any]]:
+    """Éléments du planning, mis en cache jusqu'à sa prochaine modification
+    (sans cache si settings.PAGE_CACHE_TIMEOUT vaut 0)"""
+    if not site_settings.PAGE_CACHE_TIMEOUT:
+        return planning_items(build_planning(SiteSettings.load()))
+    key = "planning:{}".format(get_version(PLANNING_VERSION))
+    items: Optional[List[Dict[str, Any]]] = cache.get(key)
+    if items is None:
+        items = planning_items(build_planning(SiteSettings.load()))
+        cache.set(key, items, site_settings.PAGE_CACHE_TIMEOUT)
+    return items
+
+
+def invalidate_planning() -> None:
+    bump_version(PLANNING_VERSION)
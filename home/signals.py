@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from home.models import ActivityModel, SlotModel
+from home.planning import invalidate_planning
+from site_settings.models import SiteSettings
+
+# Models used to build the planning
+PLANNING_MODELS = (ActivityModel, SlotModel, SiteSettings)
+
+
+def planning_changed(sender, **kwargs) -> None:
+    # Once committed, so that the old planning is never cached under the new version
+    transaction.on_commit(invalidate_planning)
+
+
+for model in PLANNING_MODELS:
+    post_save.connect(planning_changed, sender=model, dispatch_uid="planning_" + model.__name__)
+    post_delete.connect(planning_changed, sender=model, dispatch_uid="planning_" + model.__name__)
@@ -5,6 +5,8 @@ from django.urls import include, path
 from django.views.generic import RedirectView
 
 from home import views
+from pages.cache import cache_anonymous_page
+from shared.middleware import conditional_on_data
 
 sitemaps = {"static_pages": views.StaticViewSitemap}
 
@@ -17,10 +19,11 @@ urlpatterns = [
         name="activity_submission",
     ),
     path("profil/", views.ProfileView.as_view(), name="profile"),
+    path("planning.json", views.PlanningView.as_view(), name="planning.json"),
     path("favicon.ico", RedirectView.as_view(url="/static/imgs/favicon.ico")),
     path(
         "sitemap.xml",
-        sitemap,
+        conditional_on_data("pages")(cache_anonymous_page(sitemap)),
         {"sitemaps": sitemaps},
         name="django.contrib.sitemaps.views.sitemap",
     ),
@@ -29,7 +32,10 @@ urlpatterns = [
         include(("admin_pages.urls", "admin_pages"), namespace="admin_pages"),
     ),
     path("comptes/", include("accounts.urls")),
-    path("robots.txt", views.TemplateView.as_view(template_name="robots.txt", content_type="text/plain")),
+    path(
+        "robots.txt",
+        cache_anonymous_page(views.TemplateView.as_view(template_name="robots.txt", content_type="text/plain")),
+    ),
 ]
 
 if settings.DEBUG:
@@ -1,19 +1,25 @@
-from datetime import timedelta
+from copy import copy
+from datetime import datetime, timedelta
 from typing import Any, Dict, List, Optional, Tuple
 
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.sitemaps import Sitemap
 from django.core.mail import send_mail
+from django.db import transaction
 from django.forms import formset_factory
-from django.http import HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.http.response import HttpResponseBase
 from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse, reverse_lazy
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from django.views.generic import FormView, RedirectView, TemplateView, View
 
 from accounts.models import EmailUser
+from admin_pages.checks import invalidate_checks
 from home import models
 from home.forms import (
     ActivityForm,
@@ -21,8 +27,11 @@ from home.forms import (
     BaseActivityFormSet,
     InscriptionForm,
 )
+from home.planning import PLANNING_VERSION, get_planning_items
 from interludes import settings as site_settings
 from pages.models import HTMLPageModel
+from shared.cache import get_modified, get_version
+from site_settings.constants import WEBSITE_VERSION
 from site_settings.models import SiteSettings
 
 # ==============================
@@ -35,7 +44,9 @@ def get_planning_context() -> Dict[str, Any]:
     """Returns the context dict needed to display the planning"""
     settings = SiteSettings.load()
     context: Dict[str, Any] = dict()
-    context["planning"] = models.SlotModel.objects.filter(on_planning=True).order_by("title")
+    # Lazy: only queried by page contents that still iterate over it (the planning itself
+    # is loaded from planning.json), with their activity as slots display its title
+    context["planning"] = models.SlotModel.objects.filter(on_planning=True).order_by("title").select_related("activity")
     if settings.date_start is not None:
         context["friday"] = settings.date_start.day
         context["saturday"] = (settings.date_start + timedelta(days=1)).day
@@ -47,6 +58,37 @@ def get_planning_context() -> Dict[str, Any]:
     return context
 
 
+def planning_visible(request: HttpRequest) -> bool:
+    """The planning is public once displayed, superusers can preview it before"""
+    return SiteSettings.load().display_planning or request.user.is_superuser
+
+
+def planning_etag(request: HttpRequest, *args, **kwargs) -> Optional[str]:
+    if not planning_visible(request):
+        return None
+    return '"{}-{}"'.format(get_version(PLANNING_VERSION), WEBSITE_VERSION)
+
+
+def planning_last_modified(request: HttpRequest, *args, **kwargs) -> Optional[datetime]:
+    if not planning_visible(request):
+        return None
+    # Date of the last change of the planning, None if unknown (the ETag is then enough)
+    return get_modified(PLANNING_VERSION)
+
+
+class PlanningView(View):
+    """Éléments du planning au format JSON, chargés par _planning.html"""
+
+    @method_decorator(condition(etag_func=planning_etag, last_modified_func=planning_last_modified))
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if not planning_visible(request):
+            raise Http404()
+        response = JsonResponse({"items": get_planning_items()})
+        # Browsers revalidate with the ETag, getting a 304 until the planning changes
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
 # ==============================
 # Profile and registration
 # ==============================
@@ -63,7 +105,9 @@ class ProfileView(LoginRequiredMixin, TemplateView):
         settings = SiteSettings.load()
         user = self.request.user
         assert isinstance(user, EmailUser)
-        if settings.activities_allocated:
+        if not models.profile_saved(user.profile):
+            my_choices = models.ActivityChoicesModel.objects.none()
+        elif settings.activities_allocated:
             my_choices = models.ActivityChoicesModel.objects.filter(participant=user.profile, accepted=True)
         else:
             my_choices = models.ActivityChoicesModel.objects.filter(participant=user.profile)
@@ -97,21 +141,54 @@ class RegisterUpdateView(LoginRequiredMixin, TemplateView):
     def get_slots(
         participant: models.ParticipantModel,
     ) -> List[Dict[str, models.SlotModel]]:
-        activities = models.ActivityChoicesModel.objects.filter(participant=participant).order_by("priority")
+        if not models.profile_saved(participant):
+            return []
+        activities = (
+            models.ActivityChoicesModel.objects.filter(participant=participant)
+            .select_related("slot")
+            .order_by("priority")
+        )
         return [{"slot": act.slot} for act in activities]
 
     @staticmethod
     def set_activities(participant: models.ParticipantModel, formset):
-        # delete old activities
-        models.ActivityChoicesModel.objects.filter(participant=participant).delete()
-
-        priority = 0
-        for form in formset:
-            data = form.cleaned_data
-            if data:
-                slot = data["slot"]
-                models.ActivityChoicesModel(priority=priority, participant=participant, slot=slot).save()
-                priority += 1
+        """Enregistre les vœux du formset, seuls ceux qui ont changé sont modifiés"""
+        slots = [form.cleaned_data["slot"] for form in formset if form.cleaned_data]
+        priorities = {slot.id: priority for priority, slot in enumerate(slots)}
+        with transaction.atomic():
+            kept: Dict[int, models.ActivityChoicesModel] = dict()
+            removed: List[int] = []
+            for choice in models.ActivityChoicesModel.objects.filter(participant=participant):
+                if choice.slot_id in priorities:
+                    kept[choice.slot_id] = choice
+                else:
+                    removed.append(choice.id)
+            if removed:
+                models.ActivityChoicesModel.objects.filter(id__in=removed).delete()
+
+            moved = [choice for choice in kept.values() if choice.priority != priorities[choice.slot_id]]
+            if moved:
+                # (priority, participant) is unique: when a new priority is still
+                # used by another wish, first move the wishes above all old and new priorities
+                used = {choice.priority for choice in kept.values()}
+                if any(priorities[choice.slot_id] in used for choice in moved):
+                    offset = max(max(used) + 1, len(slots))
+                    for choice in moved:
+                        choice.priority = priorities[choice.slot_id] + offset
+                    models.ActivityChoicesModel.objects.bulk_update(moved, ["priority"])
+                for choice in moved:
+                    choice.priority = priorities[choice.slot_id]
+                models.ActivityChoicesModel.objects.bulk_update(moved, ["priority"])
+
+            models.ActivityChoicesModel.objects.bulk_create(
+                [
+                    models.ActivityChoicesModel(priority=priorities[slot.id], participant=participant, slot=slot)
+                    for slot in slots
+                    if slot.id not in kept
+                ]
+            )
+            # bulk_create and bulk_update send no signals
+            invalidate_checks("choices")
 
     def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         assert isinstance(request.user, EmailUser)
@@ -125,23 +202,26 @@ class RegisterUpdateView(LoginRequiredMixin, TemplateView):
     def post(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         assert isinstance(request.user, EmailUser)
         settings = SiteSettings.load()
-        form = self.form_class(request.POST, instance=request.user.profile)
+        participant = request.user.profile
+        # The form edits a copy: if it is invalid, the page still displays the saved profile
+        form = self.form_class(request.POST, instance=copy(participant))
         if settings.activity_inscriptions_open:  # meal + sleep + activities open
             formset = self.formset_class(request.POST)
             if not (form.is_valid() and formset.is_valid()):
                 context = {"form": form, "formset": formset}
                 return render(request, self.template_name, context)
-            self.set_activities(request.user.profile, formset)
+            with transaction.atomic():
+                # saved first, as the profile may not exist yet
+                participant = form.save()
+                self.set_activities(participant, formset)
 
         else:  # only meal and sleep open
             if not form.is_valid():
-                participant = request.user.profile
                 slots = self.get_slots(participant)
                 formset = self.formset_class(initial=slots)
                 context = {"form": form, "formset": formset}
                 return render(request, self.template_name, context)
-
-        form.save()
+            form.save()
 
         messages.success(request, "Votre inscription a bien été enregistrée")
         return redirect(self.success_url, permanent=False)
@@ -166,8 +246,9 @@ class UnregisterView(LoginRequiredMixin, RedirectView):
     def get_redirect_url(self, *args, **kwargs) -> str:
         assert isinstance(self.request.user, EmailUser)
         participant = self.request.user.profile
-        participant.is_registered = False
-        participant.save()
+        if models.profile_saved(participant):
+            participant.is_registered = False
+            participant.save()
         messages.success(self.request, "Vous avez été désinscrit")
         return reverse(self.pattern_name)
 
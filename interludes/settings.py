@@ -91,12 +91,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "site_settings.middleware.SingletonMemoMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    "shared.middleware.DataVersionMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
@@ -194,3 +196,33 @@ EMAIL_SIGNATURE = "-- Site Interludes (mail généré automatiquement)"
 
 # Prefix to mails to users
 USER_EMAIL_SUBJECT_PREFIX = "[interludes] "
+
+# Lifetime in seconds of public pages cached for anonymous visitors (0 to disable)
+# The cache is also cleared whenever the displayed content changes
+PAGE_CACHE_TIMEOUT: int = credentials.get_json("PAGE_CACHE_TIMEOUT", 600)
+
+# Models displayed on public pages
+# Saving or deleting one of them changes the ETag of these pages (shared.middleware)
+DATA_VERSION_MODELS: List[str] = [
+    "home.ActivityModel",
+    "home.SlotModel",
+    "pages.HTMLPageModel",
+    "site_settings.SiteSettings",
+    "site_settings.SponsorModel",
+]
+
+# Number of threads running the checks of the admin index in the background,
+# the page fills in their results as they complete (0 to run them in the request)
+CHECK_THREADS: int = credentials.get_json("CHECK_THREADS", 4)
+
+# Mass mail outbox (admin_pages.outbox)
+# Send queued emails from a background thread of the web server,
+# set to False when running "manage.py send_outbox --loop" instead
+OUTBOX_THREAD: bool = credentials.get_json("OUTBOX_THREAD", True)
+# Maximum emails sent per minute (0 for no limit)
+OUTBOX_RATE_LIMIT: int = credentials.get_json("OUTBOX_RATE_LIMIT", 120)
+# Number of emails sent over a single SMTP connection
+OUTBOX_BATCH_SIZE: int = credentials.get_json("OUTBOX_BATCH_SIZE", 50)
+# Failed emails are retried after OUTBOX_RETRY_DELAY seconds, doubled at each attempt
+OUTBOX_MAX_ATTEMPTS: int = credentials.get_json("OUTBOX_MAX_ATTEMPTS", 5)
+OUTBOX_RETRY_DELAY: int = credentials.get_json("OUTBOX_RETRY_DELAY", 60)
@@ -5,3 +5,6 @@ class PagesConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "pages"
     verbose_name = "Pages d'information"
+
+    def ready(self) -> None:
+        from pages import signals  # noqa: F401
@@ -0,0 +1,71 @@
+from functools import wraps
+from typing import Callable, Optional, cast
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
+from django.utils.timezone import now
+
+from shared.cache import bump_version, get_version
+from site_settings.models import SiteSettings
+
+# Version of the cached pages, bumped by pages.signals when content changes
+PAGES_VERSION = "pages"
+
+
+def invalidate_page_cache() -> None:
+    """Vide le cache des pages publiques"""
+    bump_version(PAGES_VERSION)
+
+
+def page_cache_timeout() -> int:
+    """Durée de vie des pages en cache, raccourcie pour expirer à l'ouverture
+    et à la fermeture des inscriptions (les pages affichées en dépendent)"""
+    timeout = settings.PAGE_CACHE_TIMEOUT
+    site_settings = SiteSettings.load()
+    current = now()
+    for date in (site_settings.inscriptions_start, site_settings.inscriptions_end):
+        if date is not None and date > current:
+            timeout = min(timeout, int((date - current).total_seconds()) + 1)
+    return timeout
+
+
+def page_cache_key(request: HttpRequest) -> Optional[str]:
+    """Clé de cache de la page, None si la requête ne peut pas utiliser le cache"""
+    if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+        return None
+    # Pending messages are displayed on the page
+    if len(get_messages(request)):
+        return None
+    return "page:{}:{}:{}".format(get_version(PAGES_VERSION), request.build_absolute_uri(), request.method)
+
+
+def cache_anonymous_page(view: Callable[..., HttpResponseBase]) -> Callable[..., HttpResponseBase]:
+    """Met en cache la réponse d'une vue publique pour les visiteurs non connectés
+    Le cache est invalidé dès qu'un modèle affiché sur les pages publiques
+    est modifié (voir pages.signals)"""
+
+    @wraps(view)
+    def wrapped(request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        key = page_cache_key(request) if settings.PAGE_CACHE_TIMEOUT else None
+        if key is None:
+            return view(request, *args, **kwargs)
+        cached: Optional[HttpResponseBase] = cache.get(key)
+        if cached is not None:
+            return cached
+        response = view(request, *args, **kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            response = cast(HttpResponseBase, response.render())
+        if (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            # the page contains a csrf token specific to this visitor
+            and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+        ):
+            cache.set(key, response, page_cache_timeout())
+        return response
+
+    return wrapped
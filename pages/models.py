@@ -1,4 +1,13 @@
+from hashlib import sha1
+from typing import Dict, Tuple
+
 from django.db import models
+from django.template import Template
+
+# Compiled content of each page, by page id: (content hash, template)
+# This cache is local to each process, the hash detects pages
+# modified by another process
+_compiled_templates: Dict[int, Tuple[str, Template]] = {}
 
 
 class HTMLPageModel(models.Model):
@@ -31,6 +40,28 @@ class HTMLPageModel(models.Model):
 
     path.__name__ = "chemin d'accès"
 
+    def template(self) -> Template:
+        """Contenu de la page compilé en template django
+        La compilation n'est faite qu'une fois par modification de la page"""
+        digest = sha1(self.content.encode()).hexdigest()
+        cached = _compiled_templates.get(self.pk)
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        template = Template(self.content)
+        if self.pk is not None:
+            _compiled_templates[self.pk] = (digest, template)
+        return template
+
+    def save(self, *args, **kwargs) -> None:
+        super().save(*args, **kwargs)
+        _compiled_templates.pop(self.pk, None)
+
+    def delete(self, *args, **kwargs):
+        pk = self.pk
+        result = super().delete(*args, **kwargs)
+        _compiled_templates.pop(pk, None)
+        return result
+
     def __str__(self) -> str:
         return self.path()
 
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from home.models import ActivityModel, SlotModel
+from pages.cache import invalidate_page_cache
+from pages.models import HTMLPageModel
+from site_settings.models import SiteSettings, SponsorModel
+
+# Models displayed on the public pages
+CACHED_MODELS = (HTMLPageModel, ActivityModel, SlotModel, SiteSettings, SponsorModel)
+
+
+def content_changed(sender, **kwargs) -> None:
+    # Once committed: a request rendering the page before the commit
+    # would otherwise store the old content under the new version
+    transaction.on_commit(invalidate_page_cache)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(content_changed, sender=model, dispatch_uid="page_cache_" + model.__name__)
+    post_delete.connect(content_changed, sender=model, dispatch_uid="page_cache_" + model.__name__)
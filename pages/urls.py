@@ -1,8 +1,13 @@
 from django.urls import path
 
+from shared.middleware import conditional_on_data
+
+from .cache import cache_anonymous_page
 from .views import HTMLPageView
 
+page_view = conditional_on_data()(cache_anonymous_page(HTMLPageView.as_view()))
+
 urlpatterns = [
-    path("", HTMLPageView.as_view(), {"slug": ""}, name="home"),
-    path("<slug:slug>/", HTMLPageView.as_view(), name="html_page"),
+    path("", page_view, {"slug": ""}, name="home"),
+    path("<slug:slug>/", page_view, name="html_page"),
 ]
@@ -1,11 +1,14 @@
 from os.path import join
+from typing import Any, Dict
 
 from django.conf import settings
+from django.db.models import QuerySet
 from django.http import Http404
-from django.template import Context, Template
+from django.template import Context
 from django.views.generic import DetailView
 
 from home.models import ActivityModel
+from home.planning import prefetch_slots
 from home.views import get_planning_context
 from site_settings.models import SiteSettings
 
@@ -28,15 +31,21 @@ class HTMLPageView(DetailView):
     template_name = "html_page.html"
     model = HTMLPageModel
 
+    def get_activities(self) -> QuerySet[ActivityModel]:
+        """Activités affichées sur la page"""
+        return ActivityModel.objects.filter(display=True)
+
+    def get_planning_context(self) -> Dict[str, Any]:
+        return get_planning_context()
+
     def get_context_data(self, **kwargs):
         """Adds the page data and slug to template render context"""
         context = super().get_context_data(**kwargs)
         context["slug"] = self.object.slug
         context["settings"] = SiteSettings.load()
-        context["activities"] = ActivityModel.objects.filter(display=True).order_by("title")
-        context.update(get_planning_context())
-        template = Template(self.object.content)
-        context["html_body"] = template.render(context=Context(context))
+        context["activities"] = prefetch_slots(self.get_activities().order_by("title"))
+        context.update(self.get_planning_context())
+        context["html_body"] = self.object.template().render(context=Context(context))
         return context
 
     def get_object(self, queryset=None):
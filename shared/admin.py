@@ -2,7 +2,8 @@ from typing import Generic, List, Optional, Type, TypeVar
 
 from django.contrib.admin import ModelAdmin
 from django.db.models import Model, QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
 
 from shared.views import CSVWriteView
 
@@ -27,13 +28,14 @@ class ExportCsvMixin(ModelAdmin, Generic[T]):
 
     csv_export_exclude: List[str] = []
     csv_export_fields: Optional[List[str]] = None
+    csv_export_streaming: bool = False  # see CSVWriteView.streaming
 
     def get_filename(self) -> str:
         if self.filename is not None:
             return self.filename
         return str(self.model._meta)
 
-    def export_as_csv(self, request: HttpRequest, queryset: QuerySet[T]) -> HttpResponse:
+    def export_as_csv(self, request: HttpRequest, queryset: QuerySet[T]) -> HttpResponseBase:
         """renvoie un fichier CSV contenant l'information du queryset"""
         view = CSVWriteViewForAdmin[T](
             request=request,
@@ -42,6 +44,7 @@ class ExportCsvMixin(ModelAdmin, Generic[T]):
             filename=self.get_filename(),
             exclude_fields=self.csv_export_exclude,
             fields=self.csv_export_fields,
+            streaming=self.csv_export_streaming,
         )
         return view.get(request)
 
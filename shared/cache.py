@@ -0,0 +1,42 @@
+from datetime import datetime
+from time import time
+from typing import Optional, cast
+
+from django.core.cache import cache
+from django.utils.timezone import now
+
+
+def version_key(name: str) -> str:
+    return "version:" + name
+
+
+def modified_key(name: str) -> str:
+    return "modified:" + name
+
+
+def get_version(name: str) -> int:
+    """Version of a group of cached data, to include in its cache keys
+    Bumping the version makes every key built from the previous one unreachable"""
+    key = version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # Start from the current time rather than 1, so that a version evicted
+        # from the cache never reuses the number of older entries still stored
+        cache.add(key, int(time() * 1000), timeout=None)
+        version = cache.get(key)
+    return int(version)
+
+
+def bump_version(name: str) -> None:
+    """Invalidates all cached data using this version"""
+    key = version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:  # key missing from the cache
+        cache.set(key, int(time() * 1000), timeout=None)
+    cache.set(modified_key(name), now(), timeout=None)
+
+
+def get_modified(name: str) -> Optional[datetime]:
+    """Date of the last bump_version, None if unknown"""
+    return cast(Optional[datetime], cache.get(modified_key(name)))
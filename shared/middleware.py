@@ -0,0 +1,110 @@
+from calendar import timegm
+from functools import partial
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpRequest
+from django.http.response import HttpResponseBase
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from shared.cache import bump_version, get_modified, get_version
+from site_settings.constants import WEBSITE_VERSION
+from site_settings.models import SiteSettings, get_year
+
+# Version of all the models in settings.DATA_VERSION_MODELS
+DATA_VERSION = "data"
+
+
+def app_data_version(app_label: str) -> str:
+    return "data:" + app_label
+
+
+def bump_data_versions(app_label: str) -> None:
+    bump_version(app_data_version(app_label))
+    bump_version(DATA_VERSION)
+
+
+def data_changed(sender, **kwargs) -> None:
+    """Bumps the data versions of the app of the saved or deleted model
+    once the transaction commits: bumping before would let a concurrent request
+    render the old data, which would then be revalidated under the new ETag"""
+    transaction.on_commit(partial(bump_data_versions, sender._meta.app_label))
+
+
+def connect_data_versions() -> None:
+    """Connects data_changed to the signals of models in settings.DATA_VERSION_MODELS,
+    called once apps are ready"""
+    for label in settings.DATA_VERSION_MODELS:
+        model = apps.get_model(label)
+        post_save.connect(data_changed, sender=model, dispatch_uid="data_version_save_" + label)
+        post_delete.connect(data_changed, sender=model, dispatch_uid="data_version_delete_" + label)
+
+
+def conditional_on_data(*app_labels: str) -> Callable:
+    """Marks a public view whose content only depends on the models of the given apps
+    listed in settings.DATA_VERSION_MODELS (on all of them by default).
+    DataVersionMiddleware answers conditional GET requests of anonymous visitors
+    to this view without running it"""
+
+    def decorator(view: Callable) -> Callable:
+        view.data_version_apps = app_labels  # type: ignore
+        return view
+
+    return decorator
+
+
+def data_etag(app_labels: Iterable[str]) -> Tuple[str, Optional[int]]:
+    """ETag and Last-Modified timestamp (None if unknown) of the content of these apps"""
+    names: List[str] = [app_data_version(label) for label in app_labels] or [DATA_VERSION]
+    site_settings = SiteSettings.load()
+    # Pages display whether registration is open and the school year, which also depend on the time
+    phase = "{:d}{:d}{}".format(
+        site_settings.inscriptions_not_open_yet(), site_settings.inscriptions_have_closed(), get_year()
+    )
+    versions = ".".join(str(get_version(name)) for name in names)
+    etag = '"{}-{}-{}"'.format(versions, phase, WEBSITE_VERSION)
+    dates = [get_modified(name) for name in names]
+    if any(date is None for date in dates):
+        return etag, None
+    return etag, timegm(max(dates).utctimetuple())  # type: ignore
+
+
+class DataVersionMiddleware:
+    """ETag and Last-Modified for views marked with conditional_on_data
+
+    For anonymous GET and HEAD requests, the response to If-None-Match and
+    If-Modified-Since is computed from the data versions before the view runs.
+    Must come after the authentication and message middlewares"""
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        response = self.get_response(request)
+        etag: Optional[Tuple[str, Optional[int]]] = getattr(request, "data_etag", None)
+        if etag is not None and response.status_code == 200 and not response.has_header("ETag"):
+            response["ETag"] = etag[0]
+            if etag[1] is not None:
+                response["Last-Modified"] = http_date(etag[1])
+            # Browsers revalidate each time, getting a 304 until the data changes
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs) -> Optional[HttpResponseBase]:
+        app_labels = getattr(view_func, "data_version_apps", None)
+        if app_labels is None or request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+            return None
+        # Pending messages are displayed on the page
+        if len(get_messages(request)):
+            return None
+        etag, last_modified = data_etag(app_labels)
+        request.data_etag = (etag, last_modified)  # type: ignore
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            patch_cache_control(response, no_cache=True)
+        return response
@@ -1,9 +1,10 @@
 import csv
-from typing import Generic, List, Optional, Type, TypeVar
+from typing import Any, Generic, Iterator, List, Optional, Type, TypeVar
 
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.db.models import Model, QuerySet
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
 from django.views import View
 
 
@@ -23,6 +24,14 @@ class SuperuserRequiredMixin(UserPassesTestMixin):
 M = TypeVar("M", bound=Model)
 
 
+class Echo:
+    """File-like object whose write returns the written value,
+    lets csv.writer produce lines instead of writing them"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
 class CSVWriteView(View, Generic[M]):
     filename = "csv_file.csv"
     headers: Optional[List[str]] = None
@@ -30,6 +39,11 @@ class CSVWriteView(View, Generic[M]):
     exclude_fields: List[str] = []
     fields: Optional[List[str]] = None
 
+    # Set to True to send rows as they are generated by self.iter_rows
+    # (with a StreamingHttpResponse) instead of building the whole file in memory
+    streaming: bool = False
+    chunk_size: int = 2000
+
     def get_filename(self) -> str:
         return self.filename
 
@@ -58,27 +72,43 @@ class CSVWriteView(View, Generic[M]):
             return self.fields
         return [field.name for field in self.model._meta.get_fields() if field.name not in self.exclude_fields]
 
-    def get_rows(self) -> List[List[str]]:
-        """overload this to return the list of rows"""
+    def iter_rows(self) -> Iterator[List[Any]]:
+        """overload this to generate the rows one by one
+        (needed to use streaming, use QuerySet.iterator(chunk_size=self.chunk_size))"""
         queryset = self.get_values()
         fields = self.get_field_names()
-        table = []
-        for row in queryset.values():
-            table.append([row[field] for field in fields])
-        return table
+        for row in queryset.values().iterator(chunk_size=self.chunk_size):
+            yield [row[field] for field in fields]
 
-    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
-        response = HttpResponse(content_type="text/csv")
-        filename = self.get_filename()
-        if not filename.endswith(".csv"):
-            filename += ".csv"
-        response["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
+    def get_rows(self) -> List[List[Any]]:
+        """overload this to return the list of rows"""
+        return list(self.iter_rows())
 
-        writer = csv.writer(response)
+    def stream(self) -> Iterator[str]:
+        """Generates the file line by line"""
+        writer = csv.writer(Echo())
         headers = self.get_headers()
         if headers is not None:
-            writer.writerow(headers)
+            yield writer.writerow(headers)
+        for row in self.iter_rows():
+            yield writer.writerow(row)
+
+    def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        response: HttpResponseBase
+        if self.streaming:
+            response = StreamingHttpResponse(self.stream(), content_type="text/csv")
+        else:
+            response = HttpResponse(content_type="text/csv")
+            writer = csv.writer(response)
+            headers = self.get_headers()
+            if headers is not None:
+                writer.writerow(headers)
+
+            for row in self.get_rows():
+                writer.writerow(row)
 
-        for row in self.get_rows():
-            writer.writerow(row)
+        filename = self.get_filename()
+        if not filename.endswith(".csv"):
+            filename += ".csv"
+        response["Content-Disposition"] = 'attachment; filename="{}"'.format(filename)
         return response
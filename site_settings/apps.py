@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SiteSettingsConfig(AppConfig):
     name = "site_settings"
     verbose_name = "Paramètres du site"
+
+    def ready(self) -> None:
+        from site_settings import signals  # noqa: F401
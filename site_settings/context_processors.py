@@ -1,11 +1,35 @@
+from typing import List, Optional
+
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from shared.cache import bump_version, get_version
 from site_settings import constants
 from site_settings.models import SiteSettings, SponsorModel, get_year
 
+# Version of the cached sponsor list, bumped by site_settings.signals
+SPONSORS_VERSION = "sponsors"
+
+
+def get_sponsors() -> List[SponsorModel]:
+    """Sponsors affichés, mis en cache jusqu'à leur prochaine modification"""
+    key = "sponsors:{}".format(get_version(SPONSORS_VERSION))
+    sponsors: Optional[List[SponsorModel]] = cache.get(key)
+    if sponsors is None:
+        sponsors = list(SponsorModel.objects.filter(display=True).order_by("name"))
+        cache.set(key, sponsors)
+    return sponsors
+
+
+def invalidate_sponsors() -> None:
+    bump_version(SPONSORS_VERSION)
+
 
 def settings(request):
+    # Settings and sponsors are only loaded if the template reads them
     return {
-        "settings": SiteSettings.load(),
+        "settings": SimpleLazyObject(SiteSettings.load),
         "constants": constants,
         "year": get_year(),
-        "sponsors": SponsorModel.objects.filter(display=True).order_by("name"),
+        "sponsors": SimpleLazyObject(get_sponsors),
     }
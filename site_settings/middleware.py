@@ -0,0 +1,16 @@
+from site_settings.models import request_singletons
+
+
+class SingletonMemoMiddleware:
+    """Garde les singletons (SiteSettings) chargés pendant une requête,
+    SingletonModel.load ne les charge ainsi qu'une fois par requête"""
+
+    def __init__(self, get_response) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request_singletons.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            request_singletons.reset(token)
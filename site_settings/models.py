@@ -1,6 +1,9 @@
+from contextvars import ContextVar
+from copy import copy
 from datetime import date, timedelta
 from pathlib import Path
-from typing import Callable, Optional, Type, TypeVar
+from typing import Callable, Dict, Optional, Tuple, Type, TypeVar
+from uuid import uuid4
 
 from django.core.cache import cache
 from django.core.files.storage import FileSystemStorage
@@ -58,9 +61,20 @@ class OverwriteStorage(FileSystemStorage):
 
 T = TypeVar("T", bound="SingletonModel")
 
+# Singletons already loaded by this process, by class name: (version stamp, object)
+_loaded_singletons: Dict[str, Tuple[str, "SingletonModel"]] = {}
+
+# Singletons loaded during the current request (see SingletonMemoMiddleware)
+request_singletons: ContextVar[Optional[Dict[str, "SingletonModel"]]] = ContextVar("request_singletons", default=None)
+
 
 class SingletonModel(models.Model):
-    """Table de la BDD qui ne possède qu'un seul élément"""
+    """Table de la BDD qui ne possède qu'un seul élément
+
+    L'élément est mis en cache avec un numéro de version. Chaque processus
+    garde le dernier élément chargé et ne le relit depuis le cache que
+    si la version a changé. Pendant une requête, load renvoie toujours
+    le même objet"""
 
     class Meta:
         abstract = True
@@ -75,18 +89,41 @@ class SingletonModel(models.Model):
         """can't delete the unique element"""
         raise ValueError("Attempting to delete unique element")
 
+    @classmethod
+    def version_key(cls) -> str:
+        return cls.__name__ + ":version"
+
     @classmethod
     def load(cls: Type[T]) -> T:
         """load and return the unique element"""
-        if cache.get(cls.__name__) is None:
-            obj, created = cls.objects.get_or_create(pk=1)
-            if not created:
+        memo = request_singletons.get()
+        if memo is not None and cls.__name__ in memo:
+            return memo[cls.__name__]  # type: ignore
+
+        stamp = cache.get(cls.version_key())
+        loaded = _loaded_singletons.get(cls.__name__)
+        if stamp is None or loaded is None or loaded[0] != stamp:
+            obj = cache.get(cls.__name__)
+            if stamp is None or obj is None or getattr(obj, "_cache_stamp", None) != stamp:
+                obj, created = cls.objects.get_or_create(pk=1)
                 obj.set_cache()
-        return cache.get(cls.__name__)  # type: ignore
+            _loaded_singletons[cls.__name__] = (obj._cache_stamp, copy(obj))
+            loaded = _loaded_singletons[cls.__name__]
+
+        # Copy so that changes made by a caller don't leak to other requests
+        obj = copy(loaded[1])
+        if memo is not None:
+            memo[cls.__name__] = obj
+        return obj  # type: ignore
 
     def set_cache(self) -> None:
         """save in cache to limit db requests"""
-        cache.set(self.__class__.__name__, self)
+        self._cache_stamp = uuid4().hex
+        cache.set_many({self.__class__.__name__: self, self.version_key(): self._cache_stamp})
+        _loaded_singletons[self.__class__.__name__] = (self._cache_stamp, copy(self))
+        memo = request_singletons.get()
+        if memo is not None:
+            memo[self.__class__.__name__] = self
 
 
 class ENS(models.TextChoices):
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from site_settings.context_processors import invalidate_sponsors
+from site_settings.models import SiteSettings, SponsorModel
+
+
+def sponsors_changed(sender, **kwargs) -> None:
+    # Once committed, so that the old list is never cached under the new version
+    transaction.on_commit(invalidate_sponsors)
+
+
+for model in (SponsorModel, SiteSettings):
+    post_save.connect(sponsors_changed, sender=model, dispatch_uid="sponsors_" + model.__name__)
+    post_delete.connect(sponsors_changed, sender=model, dispatch_uid="sponsors_" + model.__name__)